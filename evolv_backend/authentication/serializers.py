@@ -0,0 +1,53 @@
+from contextlib import nullcontext
+
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.models import update_last_login
+from rest_framework import exceptions
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+
+class LoginSerializer(TokenObtainPairSerializer):
+    """
+    Token pair serializer that authenticates the user the view already
+    resolved (context["login_user"]) instead of looking it up again.
+    Stages are recorded when the view passes context["timings"].
+    """
+
+    def stage(self, name):
+        timings = self.context.get("timings")
+        return timings.stage(name) if timings else nullcontext()
+
+    def validate(self, attrs):
+        authenticate_kwargs = {
+            self.username_field: attrs[self.username_field],
+            "password": attrs["password"],
+            "request": self.context.get("request"),
+        }
+        resolved = "login_user" in self.context
+        if resolved:
+            authenticate_kwargs["user"] = self.context["login_user"]
+
+        with self.stage("password"):
+            if resolved and authenticate_kwargs["user"] is None:
+                # Unknown identifier: still hash once so the response time
+                # does not reveal whether the account exists
+                get_user_model()().set_password(attrs["password"])
+                self.user = None
+            else:
+                self.user = authenticate(**authenticate_kwargs)
+
+        if not api_settings.USER_AUTHENTICATION_RULE(self.user):
+            raise exceptions.AuthenticationFailed(
+                self.error_messages["no_active_account"],
+                "no_active_account",
+            )
+
+        with self.stage("token"):
+            refresh = self.get_token(self.user)
+            data = {"refresh": str(refresh), "access": str(refresh.access_token)}
+
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
+
+        return data
@@ -1 +1,90 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from courses.authentication import resolve_login_user
+
+User = get_user_model()
+
+
+# Throttles count in a shared cache, so the query counts are the view's own
+@override_settings(THROTTLE_STORE="courses.throttles.CacheThrottleStore")
+class LoginTests(TestCase):
+    url = "/api/v1/auth/login/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="Ada", email="Ada@Example.com", password="secret-pass-123", is_email_verified=True
+        )
+
+    def setUp(self):
+        # Login attempts are throttled through the cache
+        cache.clear()
+
+    def login(self, username, password="secret-pass-123"):
+        return APIClient().post(self.url, {"username": username, "password": password})
+
+    def test_identifier_is_case_insensitive(self):
+        for identifier in ("ada", "ADA", "ada@example.com"):
+            with self.subTest(identifier=identifier):
+                self.assertEqual(self.login(identifier).status_code, 200)
+
+    def test_user_is_looked_up_once(self):
+        # user lookup + outstanding refresh token
+        with self.assertNumQueries(2):
+            response = self.login("ada@example.com")
+
+        self.assertIn("tokens", response.data)
+        self.assertIn("lookup;dur=", response["Server-Timing"])
+        self.assertIn("password;dur=", response["Server-Timing"])
+
+    def test_invalid_credentials(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.login("ada", "wrong").status_code, 401)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.login("nobody").status_code, 401)
+
+    def test_unverified_email_is_rejected(self):
+        User.objects.create_user(username="bob", email="bob@example.com", password="secret-pass-123")
+
+        response = self.login("bob")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(response.data["email_not_verified"])
+
+    def test_exact_match_wins_when_identifiers_collide(self):
+        # Another user's username is Ada's email, differing only in case
+        User.objects.create_user(
+            username="ada@example.com", email="other@example.com", password="other-pass-123", is_email_verified=True
+        )
+
+        self.assertEqual(self.login("ada@example.com", "other-pass-123").status_code, 200)
+        self.assertEqual(self.login("Ada@example.com").status_code, 200)
+
+    def test_exact_match_is_found_among_many_case_variants(self):
+        # Created before the exact match so an unordered limit would miss it
+        for index, username in enumerate(["ADA@EXAMPLE.COM", "Ada@Example.com"]):
+            User.objects.create_user(
+                username=username, email=f"other{index}@example.com", password="other-pass-123", is_email_verified=True
+            )
+        User.objects.create_user(
+            username="aDa@example.com", email="third@example.com", password="third-pass-123", is_email_verified=True
+        )
+
+        with self.assertNumQueries(1):
+            user = resolve_login_user("aDa@example.com")
+        self.assertEqual(user.email, "third@example.com")
+        self.assertEqual(self.login("aDa@example.com", "third-pass-123").status_code, 200)
+
+    @override_settings(
+        PASSWORD_HASHERS=["courses.hashers.TunedScryptPasswordHasher", "courses.hashers.TunedPBKDF2PasswordHasher"],
+        PASSWORD_SCRYPT_WORK_FACTOR=2**10,
+    )
+    def test_password_is_rehashed_for_new_profile(self):
+        self.assertEqual(self.login("ada").status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$1024$"))
+        self.assertEqual(self.login("ada").status_code, 200)
@@ -1,17 +1,43 @@
+import time
+from contextlib import contextmanager
+
 from django.shortcuts import render
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.response import Response
 from rest_framework import status
 
+from courses.authentication import resolve_login_user
 from courses.throttles import LoginRateThrottle
+from .serializers import LoginSerializer
 
 User = get_user_model()
 
+
+class StageTimings:
+    """Durations of the stages of a request, reported as a Server-Timing header"""
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, (time.perf_counter() - start) * 1000))
+
+    def header(self):
+        return ", ".join(f"{name};dur={duration:.1f}" for name, duration in self.stages)
+
+
 class CustomTokenObtainPairView(TokenObtainPairView):
+    serializer_class = LoginSerializer
+    throttle_classes = [LoginRateThrottle]
+
     def post(self, request, *args, **kwargs):
-        throttle_classes = [LoginRateThrottle]
-        
         # Get username/email from request
         username = request.data.get('username')
         
@@ -21,19 +47,14 @@ class CustomTokenObtainPairView(TokenObtainPairView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Find user by username or email
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            try:
-                user = User.objects.get(email=username)
-            except User.DoesNotExist:
-                # Let the parent class handle invalid credentials
-                return super().post(request, *args, **kwargs)
+        # Find user by username or email, once for the whole login
+        timings = StageTimings()
+        with timings.stage("lookup"):
+            user = resolve_login_user(username)
         
         # Check if email is verified (skip for superusers and staff)
-        if not user.is_email_verified and not user.is_superuser and not user.is_staff:
-            return Response(
+        if user is not None and not user.is_email_verified and not user.is_superuser and not user.is_staff:
+            response = Response(
                 {
                     "detail": "Please verify your email before logging in. Check your inbox for the verification link.",
                     "email_not_verified": True,
@@ -41,7 +62,19 @@ class CustomTokenObtainPairView(TokenObtainPairView):
                 },
                 status=status.HTTP_403_FORBIDDEN
             )
+            response["Server-Timing"] = timings.header()
+            return response
         
-        # Proceed with normal login
-        response = super().post(request, *args, **kwargs)
-        return Response({"message": "Login successful!", "tokens": response.data}, status=status.HTTP_200_OK)
+        # Proceed with normal login, handing the resolved user to the serializer
+        serializer = self.get_serializer(
+            data=request.data,
+            context={**self.get_serializer_context(), "login_user": user, "timings": timings},
+        )
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        response = Response({"message": "Login successful!", "tokens": serializer.validated_data}, status=status.HTTP_200_OK)
+        response["Server-Timing"] = timings.header()
+        return response
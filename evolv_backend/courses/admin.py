@@ -22,7 +22,11 @@ from .models import (
     StudentSelection,
     Profile,
     EventAttendance,
+    StatsSnapshot,
+    OutboundEmail,
+    ImageVariants,
 )
+from .stats import annotate_course_counts
 
 
 @admin.register(Student)
@@ -34,8 +38,9 @@ class StudentAdmin(admin.ModelAdmin):
         "diploma_level",
         "nationality",
         "has_laptop",
+        "application_status",
     )
-    list_filter = ("diploma_level", "nationality")
+    list_filter = ("diploma_level", "nationality", "application_status")
 
 
 @admin.register(ContactUs)
@@ -62,6 +67,22 @@ class CourseEnrollmentAdmin(admin.ModelAdmin):
     ordering = ("-applied_at",)
 
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "to", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject", "to")
+    readonly_fields = ("created_at", "sent_at", "last_error")
+
+
+@admin.register(ImageVariants)
+class ImageVariantsAdmin(admin.ModelAdmin):
+    list_display = ("source", "status", "created_at", "processed_at")
+    list_filter = ("status",)
+    search_fields = ("source",)
+    readonly_fields = ("variants", "error", "created_at", "processed_at")
+
+
 @admin.register(CourseCategory)
 class CourseCategoryAdmin(admin.ModelAdmin):
     list_display = ("name", "icon", "color", "is_active", "order", "course_count")
@@ -70,9 +91,13 @@ class CourseCategoryAdmin(admin.ModelAdmin):
     list_editable = ("is_active", "order")
     ordering = ("order", "name")
     
+    def get_queryset(self, request):
+        return annotate_course_counts(super().get_queryset(request))
+
     def course_count(self, obj):
-        return obj.courses.count()
+        return obj.course_count
     course_count.short_description = "Courses"
+    course_count.admin_order_field = "course_count"
 
 
 admin.site.register(Location)
@@ -89,3 +114,4 @@ admin.site.register(Lesson)
 admin.site.register(StudentSelection)
 admin.site.register(EventAttendance)
 admin.site.register(Profile)
+admin.site.register(StatsSnapshot)
@@ -3,36 +3,57 @@ Custom authentication backend to support login with email OR username
 """
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact
 
 User = get_user_model()
 
 
+def resolve_login_user(identifier):
+    """
+    Find the user an identifier (username or email) refers to.
+
+    Matching is case-insensitive through Lower(), so a single query is
+    answered by the functional indexes on username and email. Exact matches
+    are ordered first so the limit never drops them.
+    """
+    value = identifier.lower()
+    exact_first = Case(
+        When(Q(username=identifier) | Q(email=identifier), then=Value(0)),
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+    candidates = list(
+        User.objects.filter(
+            Q(Exact(Lower("username"), value)) | Q(Exact(Lower("email"), value))
+        ).order_by(exact_first, "pk")[:2]
+    )
+    if len(candidates) > 1:
+        # One user's username can be another user's email: only an exact
+        # match settles it
+        return next((user for user in candidates if identifier in (user.username, user.email)), None)
+    return candidates[0] if candidates else None
+
+
 class EmailOrUsernameBackend(ModelBackend):
     """
     Authenticate using email OR username with password
     """
-    def authenticate(self, request, username=None, password=None, **kwargs):
-        if username is None or password is None:
+    def authenticate(self, request, username=None, password=None, user=None, **kwargs):
+        if password is None or (username is None and user is None):
             return None
-        
-        try:
-            # Try to find user by email OR username
-            user = User.objects.get(
-                Q(email__iexact=username) | Q(username__iexact=username)
-            )
-        except User.DoesNotExist:
+
+        # Callers that already resolved the identifier pass the user along
+        # so it is not looked up again
+        if user is None:
+            user = resolve_login_user(username)
+
+        if user is None:
             # Run the default password hasher once to reduce the timing
             # difference between an existing and a nonexistent user
             User().set_password(password)
             return None
-        except User.MultipleObjectsReturned:
-            # If multiple users found, try exact match
-            user = User.objects.filter(
-                Q(email=username) | Q(username=username)
-            ).first()
-            if not user:
-                return None
         
         # Check password
         if user.check_password(password) and self.user_can_authenticate(user):
@@ -0,0 +1,62 @@
+"""
+Versioned caching helpers built on Django's cache framework
+
+Each namespace has a version number stored in the cache. Entries are
+keyed by that version, so bumping it invalidates the whole namespace
+without having to know which keys exist.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+
+
+CATALOG_NAMESPACE = "catalog"
+
+
+def calendar_namespace(year, month):
+    """Namespace of the cached event calendar for one month"""
+    return f"calendar:{year}-{month:02d}"
+
+
+def curriculum_namespace(schedule_id):
+    """Namespace of the cached curriculum tree of one learning schedule"""
+    return f"curriculum:{schedule_id}"
+
+
+def _version_key(namespace):
+    return f"version:{namespace}"
+
+
+def _initial_version():
+    # Start from a timestamp rather than 1 so a version key that was
+    # evicted never comes back pointing at entries from before eviction
+    return int(time.time() * 1000)
+
+
+def get_version(namespace):
+    """Return the current version of a cache namespace"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    """Invalidate every entry of a namespace"""
+    key = _version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def query_fingerprint(request):
+    """Stable hash of a request's query string, ignoring parameter order"""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    return hashlib.md5(query.encode()).hexdigest()
@@ -0,0 +1,160 @@
+"""
+File downloads with conditional and Range request support
+
+serve_file() answers conditional requests (ETag / Last-Modified) with 304,
+a single byte range with 206 so video players can seek without fetching
+the whole file, and everything else with the full file. It takes a storage
+name rather than a model instance, so signed media URLs (courses.media_urls)
+are served without loading any rows.
+
+Open-ended ranges ("bytes=N-", which is what players send when seeking)
+and full downloads hand the open file itself to FileResponse, so servers
+that provide wsgi.file_wrapper (gunicorn) send it with sendfile().
+
+When MEDIA_ACCEL_REDIRECT_PREFIX is set the file is not read at all: the
+response only carries an X-Accel-Redirect header and nginx serves the file
+(ranges included) from an internal location mapped to MEDIA_ROOT. Files on
+storages without a local path are redirected to the storage's own URL.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class RangeFile:
+    """Reads at most `length` bytes of a file from its current position"""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b""
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Return the inclusive (start, end) of a single byte range, or None when
+    the whole file should be sent (no header, several ranges or a header
+    that cannot be parsed). Raises RangeNotSatisfiable if the range lies
+    outside the file.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, min(end, size - 1)
+
+
+def _if_range_passes(request, etag, mtime):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/"')):
+        # Weak validators never match for ranges
+        return if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and int(mtime) <= date
+
+
+def serve_file(request, name, storage=default_storage, filename=None, as_attachment=False):
+    """Stream a stored file honouring conditional and Range headers"""
+    if not name:
+        raise Http404("No file.")
+    filename = filename or os.path.basename(name)
+
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Remote storages (S3 and the like) serve ranges themselves
+        return HttpResponseRedirect(storage.url(name))
+    except SuspiciousFileOperation:
+        raise Http404("File not found.")
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("File not found.")
+
+    etag = quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+    last_modified = http_date(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = _file_response(request, name, path, stat.st_size, filename, as_attachment, etag, stat.st_mtime)
+
+    response["ETag"] = etag
+    response["Last-Modified"] = last_modified
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def _file_response(request, name, path, size, filename, as_attachment, etag, mtime):
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = f"{settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{quote(name)}"
+        disposition = "attachment" if as_attachment else "inline"
+        response["Content-Disposition"] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
+        return response
+
+    byte_range = None
+    if _if_range_passes(request, etag, mtime):
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    file = open(path, "rb")
+    if byte_range is None:
+        return FileResponse(file, as_attachment=as_attachment, filename=filename, content_type=content_type)
+
+    start, end = byte_range
+    length = end - start + 1
+    file.seek(start)
+    # A range that runs to the end of the file can be sent straight from
+    # the file descriptor; a bounded one has to be cut short while reading
+    body = file if end == size - 1 else RangeFile(file, length)
+    response = FileResponse(
+        body, status=206, as_attachment=as_attachment, filename=filename, content_type=content_type
+    )
+    response["Content-Length"] = str(length)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
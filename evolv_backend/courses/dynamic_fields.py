@@ -0,0 +1,149 @@
+"""
+Sparse fieldsets and expandable relations for read serializers
+
+    ?fields=id,name         only return these top-level fields
+    ?expand=locations       render a relation as a nested object instead
+                            of its default compact form
+
+Serializers opt in with DynamicFieldsMixin. Views opt in with
+DynamicFieldsQuerysetMixin, which derives select_related/prefetch_related
+from the fields actually being serialized and, when ?fields= is given,
+defers the model columns none of them read.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import serializers
+
+
+def _query_list(request, param):
+    if request is None:
+        return set()
+    value = request.query_params.get(param, "")
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Serializer mixin for ?fields= and ?expand=. Only the top-level
+    serializer of a response reacts to the query parameters.
+
+    expandable_fields maps a field name to (serializer class, kwargs) used
+    when the field is expanded; kwargs may include "source".
+
+    field_dependencies maps a field name to the lookup paths it reads that
+    cannot be seen from its source, e.g. for SerializerMethodFields or
+    related fields rendered with a __str__ that follows another relation.
+    """
+    expandable_fields = {}
+    field_dependencies = {}
+
+    def _is_top_level(self):
+        parent = self.parent
+        return parent is None or (
+            isinstance(parent, serializers.ListSerializer) and parent.parent is None
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_top_level():
+            return fields
+
+        request = self.context.get("request")
+        if request is None or request.method != "GET":
+            return fields
+
+        for name in _query_list(request, "expand") & set(self.expandable_fields):
+            serializer_class, kwargs = self.expandable_fields[name]
+            fields[name] = serializer_class(read_only=True, **kwargs)
+
+        requested = _query_list(request, "fields")
+        if requested:
+            for name in set(fields) - requested:
+                fields.pop(name)
+        return fields
+
+    @classmethod
+    def plan_queryset(cls, queryset, request):
+        """
+        Replace the queryset's joins and prefetches with the ones the
+        serialized fields need
+        """
+        serializer = cls(context={"request": request})
+        select, prefetch, columns, complete = set(), set(), set(), True
+
+        for name, field in serializer.fields.items():
+            for path in serializer.field_dependencies.get(name, []):
+                _plan_path(queryset.model, path, select, prefetch, columns)
+
+            if field.source == "*":
+                if name not in serializer.field_dependencies:
+                    # A method field that may read any column
+                    complete = False
+                continue
+
+            path = LOOKUP_SEP.join(field.source_attrs)
+            _plan_path(queryset.model, path, select, prefetch, columns)
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if isinstance(nested, serializers.BaseSerializer):
+                _plan_nested(queryset.model, path, nested, select, prefetch)
+
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*sorted(prefetch))
+
+        if complete and _query_list(request, "fields"):
+            deferred = [
+                field.attname
+                for field in queryset.model._meta.concrete_fields
+                if not field.primary_key and not field.is_relation and field.name not in columns
+            ]
+            if deferred:
+                queryset = queryset.defer(*deferred)
+        return queryset
+
+
+def _plan_path(model, path, select, prefetch, columns):
+    """Record the joins/prefetches a lookup path needs, and its root column"""
+    parts = path.split(LOOKUP_SEP)
+    many = False
+    for depth, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            # A property or method of the model
+            return
+        if not field.is_relation:
+            if depth == 0:
+                columns.add(field.name)
+            return
+
+        lookup = LOOKUP_SEP.join(parts[:depth + 1])
+        many = many or field.many_to_many or field.one_to_many
+        (prefetch if many else select).add(lookup)
+        model = field.related_model
+
+
+def _plan_nested(model, path, serializer, select, prefetch):
+    """Follow the relations a nested serializer's own fields read"""
+    dependencies = getattr(serializer, "field_dependencies", {})
+    for name, field in serializer.fields.items():
+        paths = list(dependencies.get(name, []))
+        if field.source != "*":
+            paths.append(LOOKUP_SEP.join(field.source_attrs))
+        for nested_path in paths:
+            _plan_path(model, f"{path}{LOOKUP_SEP}{nested_path}", select, prefetch, set())
+
+
+class DynamicFieldsQuerysetMixin:
+    """View mixin that plans GET querysets from a DynamicFieldsMixin serializer"""
+
+    def filter_queryset(self, queryset):
+        # Planned here rather than in get_queryset() so that views which
+        # build their own queryset still get it
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if self.request.method == "GET" and issubclass(serializer_class, DynamicFieldsMixin):
+            queryset = serializer_class.plan_queryset(queryset, self.request)
+        return queryset
@@ -0,0 +1,63 @@
+"""
+Course material type detection
+
+detect_material_type() looks at a file's leading bytes first and only falls
+back to the extension for formats without a signature (text, CSV) or for
+containers whose signature is shared by several types (ZIP and OLE2 are
+used by office documents, spreadsheets and plain archives alike).
+"""
+import os
+
+
+EXTENSION_TYPES = {
+    "video": {".mp4", ".avi", ".mov", ".wmv", ".flv", ".mkv", ".webm", ".m4v"},
+    "document": {".pdf", ".doc", ".docx", ".ppt", ".pptx", ".txt", ".rtf", ".odt"},
+    "spreadsheet": {".csv", ".xls", ".xlsx", ".ods"},
+    "archive": {".zip", ".rar", ".7z", ".tar", ".gz", ".bz2"},
+}
+
+# Bytes needed from the start of a file to recognise every signature below
+SNIFF_SIZE = 512
+
+ZIP_SIGNATURE = b"PK\x03\x04"
+OLE2_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+SIGNATURES = [
+    (b"%PDF-", "document"),
+    (b"{\\rtf", "document"),
+    (b"\x1a\x45\xdf\xa3", "video"),  # Matroska / WebM
+    (b"FLV\x01", "video"),
+    (b"\x30\x26\xb2\x75\x8e\x66\xcf\x11", "video"),  # ASF / WMV
+    (b"Rar!\x1a\x07", "archive"),
+    (b"7z\xbc\xaf\x27\x1c", "archive"),
+    (b"\x1f\x8b", "archive"),  # gzip
+    (b"BZh", "archive"),
+]
+
+
+def material_type_for_extension(filename):
+    ext = os.path.splitext(filename)[1].lower()
+    for material_type, extensions in EXTENSION_TYPES.items():
+        if ext in extensions:
+            return material_type
+    return "other"
+
+
+def detect_material_type(head, filename):
+    """Material type of a file from its first SNIFF_SIZE bytes and its name"""
+    by_extension = material_type_for_extension(filename)
+
+    for signature, material_type in SIGNATURES:
+        if head.startswith(signature):
+            return material_type
+    if head[4:8] == b"ftyp":  # MP4 / MOV / M4V
+        return "video"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "video"
+    if head[257:262] == b"ustar":
+        return "archive"
+    if head.startswith(ZIP_SIGNATURE):
+        return by_extension if by_extension in ("document", "spreadsheet") else "archive"
+    if head.startswith(OLE2_SIGNATURE):
+        return by_extension if by_extension in ("document", "spreadsheet") else "document"
+    return by_extension
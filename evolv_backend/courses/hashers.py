@@ -0,0 +1,43 @@
+"""
+Password hashers whose cost is read from settings
+
+Each hasher keeps Django's algorithm name, so hashes it produces are
+interchangeable with the stock hashers. Django rehashes a password on the
+next successful login whenever the stored algorithm or cost differs from
+the first entry of PASSWORD_HASHERS, which is how a change of profile or
+parameters is rolled out to existing users.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Requires the optional argon2-cffi package"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
@@ -0,0 +1,251 @@
+"""
+Responsive image variants
+
+Saving a profile picture, event, category, team member or about-us image
+queues an ImageVariants row for it. The process_image_variants worker claims
+queued rows in batches and renders every width in IMAGE_VARIANT_WIDTHS that
+is narrower than the original, in each of IMAGE_VARIANT_FORMATS, into
+IMAGE_VARIANTS_DIR of the default storage. Images are decoded and encoded in
+a thread pool (Pillow releases the GIL while doing so), never on the
+request path, and with no transaction open.
+
+Read serializers expose the result through ImageVariantsField as srcset
+strings per format, e.g. {"webp": ".../320w.webp 320w, .../640w.webp 640w"}.
+The field is None until the variants are ready, so clients keep using the
+original image until then.
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+from rest_framework import serializers
+from rest_framework.fields import get_attribute
+
+from .cache import CATALOG_NAMESPACE, bump_version
+from .models import AboutUs, CourseCategory, Event, ImageVariants, Profile, TeamMember
+
+# Image fields that get variants, per model
+IMAGE_FIELDS = {
+    Profile: "profile_picture",
+    Event: "image",
+    CourseCategory: "image",
+    TeamMember: "image",
+    AboutUs: "image",
+}
+
+FORMAT_OPTIONS = {
+    "webp": ("WEBP", "webp", {"method": 4}),
+    "jpeg": ("JPEG", "jpg", {"optimize": True, "progressive": True}),
+}
+
+
+def enqueue_image_variants(names):
+    """Queue variant generation for stored images that have none yet"""
+    rows = [ImageVariants(source=name) for name in {name for name in names if name}]
+    if rows:
+        ImageVariants.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def variant_name(source, width, extension):
+    stem = os.path.splitext(source)[0]
+    return f"{settings.IMAGE_VARIANTS_DIR}/{stem}/{width}w.{extension}"
+
+
+def _prepare(image, image_format):
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if image_format == "JPEG":
+        if has_alpha:
+            rgba = image.convert("RGBA")
+            flattened = Image.new("RGB", rgba.size, (255, 255, 255))
+            flattened.paste(rgba, mask=rgba.getchannel("A"))
+            return flattened
+        return image if image.mode == "RGB" else image.convert("RGB")
+    if image.mode not in ("RGB", "RGBA"):
+        return image.convert("RGBA" if has_alpha else "RGB")
+    return image
+
+
+def build_variants(source):
+    """
+    Render and store every variant of one image. Returns the stored names
+    as {format: {width: name}}.
+    """
+    with default_storage.open(source, "rb") as stored:
+        with Image.open(stored) as original:
+            image = ImageOps.exif_transpose(original)
+
+    widths = [width for width in settings.IMAGE_VARIANT_WIDTHS if width < image.width] or [image.width]
+    variants = {}
+    for width in sorted(widths):
+        if width == image.width:
+            resized = image
+        else:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        for format_name in settings.IMAGE_VARIANT_FORMATS:
+            image_format, extension, options = FORMAT_OPTIONS[format_name]
+            buffer = io.BytesIO()
+            _prepare(resized, image_format).save(
+                buffer, image_format, quality=settings.IMAGE_VARIANT_QUALITY, **options
+            )
+
+            name = variant_name(source, width, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            variants.setdefault(format_name, {})[str(width)] = default_storage.save(
+                name, ContentFile(buffer.getvalue())
+            )
+    return variants
+
+
+def _build_safely(source):
+    try:
+        return build_variants(source), ""
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        return None, f"{type(exc).__name__}: {exc}"
+
+
+def claim_image_variants(batch_size):
+    """
+    Claim up to batch_size queued images for this worker and commit the
+    claim, so no lock is held while they are rendered
+    """
+    now = timezone.now()
+    claimed_until = now + timedelta(seconds=settings.IMAGE_VARIANT_CLAIM_TIMEOUT)
+
+    with transaction.atomic():
+        # skip_locked lets several workers share the queue; "processing"
+        # rows are only picked up again once their claim has expired
+        batch = list(
+            ImageVariants.objects.select_for_update(skip_locked=True)
+            .filter(Q(status="pending") | Q(status="processing", claimed_until__lte=now))
+            .order_by("created_at")[:batch_size]
+        )
+        if batch:
+            ImageVariants.objects.filter(pk__in=[row.pk for row in batch]).update(
+                status="processing", claimed_until=claimed_until
+            )
+    return batch
+
+
+def process_image_variants(batch_size=20, workers=4):
+    """
+    Claim one batch of queued images and render it in a thread pool.
+    Returns a (ready, failed) tuple of counts.
+    """
+    ready = failed = 0
+    batch = claim_image_variants(batch_size)
+    if not batch:
+        return ready, failed
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_build_safely, [row.source for row in batch]))
+
+    now = timezone.now()
+    for row, (variants, error) in zip(batch, results):
+        row.processed_at, row.claimed_until = now, None
+        if variants is None:
+            row.status, row.error = "failed", error
+            failed += 1
+        else:
+            row.status, row.variants, row.error = "ready", variants, ""
+            ready += 1
+
+    with transaction.atomic():
+        ImageVariants.objects.bulk_update(batch, ["status", "variants", "error", "processed_at", "claimed_until"])
+
+        # Cached catalog pages embed category images
+        ready_sources = [row.source for row in batch if row.status == "ready"]
+        if CourseCategory.objects.filter(image__in=ready_sources).exists():
+            transaction.on_commit(lambda: bump_version(CATALOG_NAMESPACE))
+    return ready, failed
+
+
+class ImageVariantManifest:
+    """
+    Ready variants of images, looked up in one query per batch of names and
+    reused for the rest of the request
+    """
+
+    def __init__(self):
+        self._variants = {}
+
+    def preload(self, names):
+        missing = {name for name in names if name and name not in self._variants}
+        if not missing:
+            return
+        rows = ImageVariants.objects.filter(source__in=missing, status="ready").values_list("source", "variants")
+        self._variants.update(rows)
+        for name in missing:
+            self._variants.setdefault(name, None)
+
+    def get(self, name):
+        self.preload([name])
+        return self._variants[name]
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read-only srcset strings per format for an image field, or None while
+    its variants are not ready. In a list, every row's variants are loaded
+    with one query.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def _manifest(self):
+        manifest = self.context.get("image_variants")
+        if manifest is None:
+            manifest = self.context["image_variants"] = ImageVariantManifest()
+            manifest.preload(self._names_in_list())
+        return manifest
+
+    def _names_in_list(self):
+        """Names of this field's image in every row of a list response"""
+        root = self.root
+        if not isinstance(root, serializers.ListSerializer) or root.instance is None:
+            return []
+
+        # Serializers nested between a row and this field, e.g. the
+        # category_details of a course
+        chain = []
+        node = self.parent
+        while node is not root.child:
+            if node is None or isinstance(node, serializers.ListSerializer):
+                return []
+            chain.append(node)
+            node = node.parent
+
+        names = []
+        for obj in root.instance:
+            for node in reversed(chain):
+                obj = get_attribute(obj, node.source_attrs) if obj is not None else None
+            if obj is not None:
+                names.append(getattr(get_attribute(obj, self.source_attrs), "name", None))
+        return names
+
+    def to_representation(self, value):
+        variants = self._manifest().get(value.name) if value else None
+        if not variants:
+            return None
+
+        request = self.context.get("request")
+        srcsets = {}
+        for format_name, names in variants.items():
+            candidates = []
+            for width, name in sorted(names.items(), key=lambda item: int(item[0])):
+                url = default_storage.url(name)
+                candidates.append(f"{request.build_absolute_uri(url) if request else url} {width}w")
+            srcsets[format_name] = ", ".join(candidates)
+        return srcsets
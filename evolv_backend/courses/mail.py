@@ -0,0 +1,169 @@
+"""
+Outbound email queue
+
+Request handlers call queue_email()/queue_emails(), which only insert
+OutboundEmail rows. The send_queued_email management command delivers due
+rows in batches over one connection, retrying failures with exponential
+backoff and dead-lettering them after EMAIL_OUTBOX_MAX_ATTEMPTS.
+
+A batch is first claimed (status "sending") and committed, so no row lock
+is held while talking to the mail server, and each outcome is recorded as
+soon as its message has been handed over. A worker that dies mid-batch
+therefore leaves only unrecorded emails behind; their claim expires after
+EMAIL_OUTBOX_CLAIM_TIMEOUT seconds and another worker picks them up.
+sweep_outbound_email deletes sent and dead-lettered emails once they are
+older than EMAIL_OUTBOX_RETENTION_DAYS.
+"""
+import logging
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+DeliveryResult = namedtuple("DeliveryResult", ["message", "sent", "error"])
+
+
+def send_batch(messages, connection=None):
+    """
+    Send related messages over one connection and report the outcome of
+    each one. An already open connection is reused and left open.
+    """
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        opened = connection.open()
+    except Exception as exc:
+        return [DeliveryResult(message, False, exc) for message in messages]
+
+    results = []
+    try:
+        for message in messages:
+            try:
+                sent = connection.send_messages([message])
+            except Exception as exc:
+                results.append(DeliveryResult(message, False, exc))
+            else:
+                results.append(DeliveryResult(message, bool(sent), None))
+    finally:
+        if opened:
+            connection.close()
+    return results
+
+
+def queue_emails(messages, sensitive=False):
+    """
+    Queue EmailMessages for delivery with a single INSERT. When the outbox
+    is disabled they are sent right away as one batch instead. The bodies of
+    sensitive emails are not kept once they have been sent.
+    """
+    if not settings.EMAIL_OUTBOX_ENABLED:
+        for result in send_batch(messages):
+            if not result.sent:
+                logger.warning("Failed to send email %r to %s: %s", result.message.subject, result.message.to, result.error)
+        return []
+    return OutboundEmail.objects.bulk_create(
+        [OutboundEmail.from_message(message, sensitive=sensitive) for message in messages]
+    )
+
+
+def queue_email(message, sensitive=False):
+    """Queue a single EmailMessage for delivery"""
+    queued = queue_emails([message], sensitive=sensitive)
+    return queued[0] if queued else None
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt after `attempts` failures"""
+    return timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def claim_queued_emails(batch_size):
+    """
+    Claim up to batch_size due emails for this worker and commit the claim.
+    Claiming counts as an attempt, so an email that keeps crashing its
+    worker is still dead-lettered eventually.
+    """
+    now = timezone.now()
+    claimed_until = now + timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+
+    with transaction.atomic():
+        # skip_locked lets several workers drain the queue without
+        # picking up the same rows; "sending" rows are only due again
+        # once their claim has expired
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=["queued", "sending"], next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        if batch:
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                status="sending", next_attempt_at=claimed_until, attempts=F("attempts") + 1
+            )
+
+    for email in batch:
+        email.status = "sending"
+        email.next_attempt_at = claimed_until
+        email.attempts += 1
+    return batch
+
+
+def record_delivery(email, result):
+    """Store the outcome of one claimed email and return its counter name"""
+    if result.sent:
+        email.status = "sent"
+        email.sent_at = timezone.now()
+        email.last_error = ""
+    else:
+        error = result.error
+        email.last_error = f"{type(error).__name__}: {error}" if error else "Not accepted by the mail backend"
+        if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            email.status = "failed"
+        else:
+            email.status = "queued"
+            email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+
+    update_fields = ["status", "next_attempt_at", "last_error", "sent_at"]
+    if email.sensitive and email.status != "queued":
+        email.body = ""
+        update_fields.append("body")
+    email.save(update_fields=update_fields)
+    return {"sent": "sent", "failed": "failed"}.get(email.status, "retried")
+
+
+def deliver_queued_emails(batch_size=50):
+    """
+    Deliver one batch of due emails over a single connection.
+    Returns a (sent, retried, failed) tuple of counts.
+    """
+    counts = {"sent": 0, "retried": 0, "failed": 0}
+    batch = claim_queued_emails(batch_size)
+    if not batch:
+        return counts["sent"], counts["retried"], counts["failed"]
+
+    connection = get_connection(fail_silently=False)
+    try:
+        opened, open_error = connection.open(), None
+    except Exception as exc:
+        opened, open_error = False, exc
+
+    try:
+        for email in batch:
+            if open_error is not None:
+                result = DeliveryResult(None, False, open_error)
+            else:
+                # The connection is already open, so send_batch reuses it
+                result = send_batch([email.to_message()], connection)[0]
+            counts[record_delivery(email, result)] += 1
+    finally:
+        if opened:
+            connection.close()
+
+    return counts["sent"], counts["retried"], counts["failed"]
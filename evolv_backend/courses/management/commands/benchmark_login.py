@@ -0,0 +1,70 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure login latency (user lookup + password check) for each password hasher profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', dest='profiles',
+                            help='Profile to measure (repeatable, default: all)')
+        parser.add_argument('--logins', type=int, default=20, help='Logins timed per profile')
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or list(settings.PASSWORD_HASHER_PROFILES)
+        unknown = set(profiles) - set(settings.PASSWORD_HASHER_PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(sorted(unknown))}")
+
+        self.stdout.write(f"{'profile':<10} {'p50 ms':>9} {'p95 ms':>9} {'logins/s':>9}")
+        for profile in profiles:
+            hashers = settings.PASSWORD_HASHER_PROFILES[profile] + [
+                hasher for hasher in settings.PASSWORD_HASHERS
+                if hasher not in settings.PASSWORD_HASHER_PROFILES[profile]
+            ]
+            with override_settings(PASSWORD_HASHERS=hashers):
+                try:
+                    durations = self.time_logins(options['logins'])
+                except ValueError as exc:
+                    # e.g. argon2-cffi is not installed
+                    self.stdout.write(self.style.WARNING(f"{profile:<10} skipped: {exc}"))
+                    continue
+
+            durations.sort()
+            p50 = statistics.median(durations)
+            p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+            # A sync worker handles one login at a time
+            per_second = 1000 / statistics.mean(durations)
+            self.stdout.write(f"{profile:<10} {p50:>9.1f} {p95:>9.1f} {per_second:>9.1f}")
+
+    def time_logins(self, count):
+        """Time `count` logins of a throwaway user, then roll it back"""
+        durations = []
+        password = 'benchmark-password-123'
+        try:
+            with transaction.atomic():
+                User.objects.create_user(
+                    username='benchmark-login', email='benchmark-login@example.com', password=password
+                )
+                for _ in range(count):
+                    start = time.perf_counter()
+                    user = authenticate(username='benchmark-login', password=password)
+                    durations.append((time.perf_counter() - start) * 1000)
+                    if user is None:
+                        raise CommandError("Benchmark login failed")
+                raise Rollback
+        except Rollback:
+            pass
+        return durations
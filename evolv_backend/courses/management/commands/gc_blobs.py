@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from courses.models import CourseMaterial, StoredBlob
+
+
+class Command(BaseCommand):
+    help = 'Recount blob references and delete blobs no course material uses, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Blobs deleted per transaction')
+        parser.add_argument(
+            '--grace-hours', type=int, default=24,
+            help='Only delete blobs unreferenced and untouched for this long, so uploads in flight keep theirs'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted')
+
+    def handle(self, *args, **options):
+        # Signal handlers keep ref_count current; recounting repairs drift
+        # from bulk operations that bypass them
+        references = (
+            CourseMaterial.objects.filter(file=OuterRef('name'))
+            .order_by().values('file').annotate(count=Count('pk')).values('count')
+        )
+        StoredBlob.objects.update(
+            ref_count=Coalesce(Subquery(references, output_field=IntegerField()), Value(0))
+        )
+
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        orphans = StoredBlob.objects.filter(ref_count=0, updated_at__lt=cutoff).order_by('pk')
+
+        if options['dry_run']:
+            count = orphans.count()
+            self.stdout.write(f"{count} unreferenced blob(s) would be deleted")
+            return
+
+        total = 0
+        while True:
+            with transaction.atomic():
+                batch = list(orphans.select_for_update(skip_locked=True)[:options['batch_size']])
+                if not batch:
+                    break
+                # Files go while their rows are still locked: an upload of the
+                # same content waits on the row and then stores the file again
+                self.delete_files(batch)
+                StoredBlob.objects.filter(pk__in=[blob.pk for blob in batch]).delete()
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} unreferenced blob(s)"))
+
+    def delete_files(self, blobs):
+        for blob in blobs:
+            # ContentAddressedStorage.delete() leaves blobs alone
+            default_storage.delete(blob.name)
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from courses.images import IMAGE_FIELDS, enqueue_image_variants, process_image_variants
+
+
+class Command(BaseCommand):
+    help = 'Render responsive WebP/JPEG variants of uploaded images (use --loop to run as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Images claimed per transaction')
+        parser.add_argument('--workers', type=int, default=4, help='Threads resizing and encoding images')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to wait when the queue is empty')
+        parser.add_argument(
+            '--enqueue-existing', action='store_true',
+            help='First queue every stored image that has no variants yet'
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue_existing']:
+            for model, field in IMAGE_FIELDS.items():
+                names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                enqueue_image_variants(names.values_list(field, flat=True).iterator())
+                self.stdout.write(f"Queued {model._meta.verbose_name_plural} images")
+
+        while True:
+            ready, failed = process_image_variants(batch_size=options['batch_size'], workers=options['workers'])
+            if ready or failed:
+                self.stdout.write(f"Rendered {ready}, failed {failed}")
+
+            if not options['loop']:
+                break
+            # Drain full batches back to back, otherwise wait for new uploads
+            if ready + failed < options['batch_size']:
+                time.sleep(options['interval'])
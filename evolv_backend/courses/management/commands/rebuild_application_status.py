@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from courses.models import Student, StudentSelection
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized application status of every student'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Students updated per query')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # One grouped aggregate for all students instead of one per student
+        counts = {
+            row['student_id']: (row['total'], row['completed'])
+            for row in StudentSelection.objects.order_by().values('student_id').annotate(
+                total=Count('id'),
+                completed=Count('id', filter=Q(status='Completed')),
+            )
+        }
+
+        updated = 0
+        batch = []
+        students = Student.objects.only('id', 'application_status', 'total_steps', 'completed_steps')
+        for student in students.iterator(chunk_size=batch_size):
+            total, completed = counts.get(student.pk, (0, 0))
+            status = Student.compute_application_status(total, completed)
+            if (student.total_steps, student.completed_steps, student.application_status) == (total, completed, status):
+                continue
+            student.total_steps = total
+            student.completed_steps = completed
+            student.application_status = status
+            batch.append(student)
+            if len(batch) >= batch_size:
+                updated += self._flush(batch)
+                batch = []
+        updated += self._flush(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Updated application status for {updated} student(s)"))
+
+    def _flush(self, batch):
+        if not batch:
+            return 0
+        with transaction.atomic():
+            Student.objects.bulk_update(batch, ['application_status', 'total_steps', 'completed_steps'])
+        return len(batch)
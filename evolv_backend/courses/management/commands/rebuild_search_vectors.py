@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from courses.search import SEARCH_VECTORS, supports_search_vectors, update_search_vectors
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored full-text search vectors of courses, lessons and alumni, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows updated per statement')
+
+    def handle(self, *args, **options):
+        for model in SEARCH_VECTORS:
+            if not supports_search_vectors(model):
+                self.stdout.write(f"Skipping {model.__name__}: search vectors need PostgreSQL")
+                continue
+
+            ids = list(model.objects.order_by('pk').values_list('pk', flat=True))
+            total = 0
+            for start in range(0, len(ids), options['batch_size']):
+                total += update_search_vectors(model, ids[start:start + options['batch_size']])
+
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} {model._meta.verbose_name_plural} search vector(s)"))
@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from courses.stats import refresh_admin_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the admin dashboard statistics snapshot (run on a schedule, or use --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep recomputing the snapshot')
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Seconds between recomputes (default: ADMIN_STATS_MAX_AGE)'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval'] if options['interval'] is not None else settings.ADMIN_STATS_MAX_AGE
+        while True:
+            snapshot = refresh_admin_stats()
+            self.stdout.write(self.style.SUCCESS(f"✓ Admin statistics computed at {snapshot.computed_at:%Y-%m-%d %H:%M:%S}"))
+
+            if not options['loop']:
+                break
+            time.sleep(interval)
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from courses.mail import deliver_queued_emails
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound emails (use --loop to run as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails sent per connection')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, retried, failed = deliver_queued_emails(batch_size=options['batch_size'])
+            if sent or retried or failed:
+                self.stdout.write(f"Sent {sent}, retrying {retried}, failed {failed}")
+
+            if not options['loop']:
+                break
+            # Drain full batches back to back, otherwise wait for new mail
+            if sent + retried + failed < options['batch_size']:
+                time.sleep(options['interval'])
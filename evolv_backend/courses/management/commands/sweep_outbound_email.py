@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from courses.models import OutboundEmail
+
+
+class Command(BaseCommand):
+    help = 'Delete sent and dead-lettered outbound emails past their retention period, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Emails deleted per statement')
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Keep emails this many days (default: EMAIL_OUTBOX_RETENTION_DAYS)'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.EMAIL_OUTBOX_RETENTION_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+        expired = OutboundEmail.objects.filter(
+            Q(status='sent', sent_at__lt=cutoff) | Q(status='failed', created_at__lt=cutoff)
+        ).order_by()
+        total = 0
+
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted, _ = OutboundEmail.objects.filter(id__in=ids).delete()
+            total += deleted
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} outbound email(s)"))
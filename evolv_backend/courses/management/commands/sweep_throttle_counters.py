@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from courses.models import ThrottleCounter
+
+
+class Command(BaseCommand):
+    help = 'Delete throttle counters whose window has ended, in batches (use --loop to run as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Counters deleted per statement')
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping')
+        parser.add_argument('--interval', type=float, default=3600, help='Seconds between sweeps')
+
+    def handle(self, *args, **options):
+        while True:
+            total = self.sweep(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired throttle counter(s)"))
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def sweep(self, batch_size):
+        expired = ThrottleCounter.objects.filter(expires_at__lt=timezone.now()).order_by()
+        total = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return total
+            deleted, _ = ThrottleCounter.objects.filter(id__in=ids).delete()
+            total += deleted
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from courses.models import UploadSession
+from courses.uploads import discard_staged_file
+
+
+class Command(BaseCommand):
+    help = 'Delete expired upload sessions and their staged files, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Sessions deleted per statement')
+
+    def handle(self, *args, **options):
+        expired = UploadSession.objects.filter(expires_at__lt=timezone.now()).order_by()
+        total = 0
+
+        while True:
+            sessions = list(expired.only('id')[:options['batch_size']])
+            if not sessions:
+                break
+            for session in sessions:
+                discard_staged_file(session)
+            deleted, _ = UploadSession.objects.filter(id__in=[session.id for session in sessions]).delete()
+            total += deleted
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired upload session(s)"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from courses.models import EmailVerificationToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired email verification tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tokens deleted per statement')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = EmailVerificationToken.objects.filter(expires_at__lt=now).order_by()
+        total = 0
+
+        # Short deletes keep each statement's locks brief on a large table
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted, _ = EmailVerificationToken.objects.filter(id__in=ids).delete()
+            total += deleted
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired verification token(s)"))
@@ -0,0 +1,54 @@
+# Denormalize student selection progress onto Student
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_application_status(apps, schema_editor):
+    """Compute the selection progress of existing students"""
+    Student = apps.get_model('courses', 'Student')
+    StudentSelection = apps.get_model('courses', 'StudentSelection')
+
+    counts = StudentSelection.objects.order_by().values('student_id').annotate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='Completed')),
+    )
+    for row in counts:
+        total, completed = row['total'], row['completed']
+        if completed == total:
+            application_status = 'approved'
+        elif completed > 0:
+            application_status = 'in_progress'
+        else:
+            application_status = 'pending'
+        Student.objects.filter(pk=row['student_id']).update(
+            total_steps=total,
+            completed_steps=completed,
+            application_status=application_status,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0029_add_admin_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='application_status',
+            field=models.CharField(choices=[('submitted', 'Submitted'), ('pending', 'Pending'), ('in_progress', 'In Progress'), ('approved', 'Approved')], db_index=True, default='submitted', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='completed_steps',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='total_steps',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_application_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0030_student_application_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('data', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:50
+
+import re
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each year's counter after the highest register number already issued"""
+    Student = apps.get_model("courses", "Student")
+    RegisterNumberSequence = apps.get_model("courses", "RegisterNumberSequence")
+
+    pattern = re.compile(r"^EVOLV-(\d{4})-(\d+)$")
+    last_values = {}
+    for register_number in Student.objects.filter(register_number__startswith="EVOLV-").values_list("register_number", flat=True).iterator():
+        match = pattern.match(register_number)
+        if match:
+            year, value = int(match.group(1)), int(match.group(2))
+            last_values[year] = max(last_values.get(year, 0), value)
+
+    RegisterNumberSequence.objects.bulk_create(
+        RegisterNumberSequence(year=year, last_value=value) for year, value in last_values.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0032_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegisterNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(unique=True)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:52
+
+import hashlib
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def move_tokens(apps, schema_editor):
+    """Carry outstanding verification links over as hashed tokens"""
+    CustomUser = apps.get_model("courses", "CustomUser")
+    EmailVerificationToken = apps.get_model("courses", "EmailVerificationToken")
+
+    lifetime = timedelta(hours=settings.EMAIL_VERIFICATION_TOKEN_LIFETIME)
+    pending = (
+        CustomUser.objects.filter(is_email_verified=False)
+        .exclude(email_verification_token__isnull=True)
+        .exclude(email_verification_token="")
+        .values_list("id", "email_verification_token", "email_verification_sent_at")
+    )
+    EmailVerificationToken.objects.bulk_create(
+        EmailVerificationToken(
+            user_id=user_id,
+            token_hash=hashlib.sha256(token.encode()).hexdigest(),
+            expires_at=(sent_at or timezone.now()) + lifetime,
+        )
+        for user_id, token, sent_at in pending.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0033_registernumbersequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailVerificationToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_hash', models.CharField(max_length=64, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='emailverificationtoken',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='email_verification_tokens', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(move_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='email_verification_token',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0036_throttlecounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='courseenrollment',
+            index=models.Index(fields=['-applied_at'], name='enrollment_applied_at_idx'),
+        ),
+    ]
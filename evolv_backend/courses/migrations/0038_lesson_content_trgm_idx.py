@@ -0,0 +1,27 @@
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+import courses.models
+
+
+# Lesson content filters use icontains, which Django renders on Postgres as
+# UPPER("content"::text) LIKE UPPER(...). A trigram GIN index on that same
+# expression lets those filters use the index instead of scanning every
+# lesson. Other databases keep the plain scan.
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0037_courseenrollment_applied_at_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=courses.models.PostgresGinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('content', models.TextField())), name='gin_trgm_ops'), name='lesson_content_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.6 on 2026-10-17 18:09
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+
+import courses.models
+
+
+# Weighted columns of each stored vector, matching courses.search
+SEARCH_COLUMNS = {
+    "courses_course": [("name", "A"), ("software_tools", "B"), ("description", "C")],
+    "courses_lesson": [("title", "A"), ("description", "B"), ("content", "C")],
+    "courses_alumni": [
+        ("(SELECT username FROM courses_customuser WHERE id = courses_alumni.user_id)", "A"),
+        ("current_position", "A"),
+        ("success_story", "B"),
+    ],
+}
+
+
+def build_search_vectors(apps, schema_editor):
+    # The backfill only applies to PostgreSQL; elsewhere the column stays
+    # empty and searches fall back to icontains
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, columns in SEARCH_COLUMNS.items():
+        vector = " || ".join(
+            f"setweight(to_tsvector(%s::regconfig, COALESCE(({column})::text, '')), '{weight}')"
+            for column, weight in columns
+        )
+        schema_editor.execute(
+            f"UPDATE {table} SET search_vector = {vector}",
+            [settings.SEARCH_CONFIG] * len(columns),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0038_lesson_content_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alumni',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(build_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='alumni',
+            index=courses.models.PostgresGinIndex(fields=['search_vector'], name='courses_alumni_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=courses.models.PostgresGinIndex(fields=['search_vector'], name='courses_course_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=courses.models.PostgresGinIndex(fields=['search_vector'], name='courses_lesson_search_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-17 18:18
+
+import courses.models
+import courses.storage
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0040_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='coursematerial',
+            name='file',
+            field=models.FileField(help_text='Upload file (video, PDF, CSV, etc.)', storage=courses.storage.ContentAddressedStorage(), upload_to=courses.models.course_material_upload_path),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Stop keeping email verification links in the outbox
+
+from django.db import migrations, models
+
+VERIFICATION_SUBJECT = 'Verify Your Email - EvolvLearn'
+
+
+def mark_verification_emails(apps, schema_editor):
+    """Flag queued verification emails and clear the ones already delivered"""
+    OutboundEmail = apps.get_model('courses', 'OutboundEmail')
+    verification = OutboundEmail.objects.filter(subject=VERIFICATION_SUBJECT)
+    verification.update(sensitive=True)
+    verification.filter(status__in=['sent', 'failed']).update(body='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0043_outboundemail_sending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='sensitive',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_verification_emails, migrations.RunPython.noop),
+    ]
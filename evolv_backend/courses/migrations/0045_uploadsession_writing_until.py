@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0044_outboundemail_sensitive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='writing_until',
+            field=models.DateTimeField(blank=True, help_text='Lease of the chunk being written, if any', null=True),
+        ),
+    ]
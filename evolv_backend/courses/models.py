@@ -1,6 +1,18 @@
+import hashlib
+import os
+import secrets
+import uuid
+from datetime import timedelta
+
 from django.contrib.auth.models import User, AbstractUser, Group, Permission
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.backends.ddl_references import Statement
+from django.db.models.functions import Cast, Lower, Upper
 from django.conf import settings
+from django.core.mail import EmailMessage
+from django.utils import timezone
 
 from django.contrib.auth import get_user_model
 from django_countries.fields import CountryField
@@ -9,11 +21,30 @@ from dateutil.relativedelta import relativedelta
 from django.core.validators import MinValueValidator, MaxValueValidator
 from datetime import date
 
+from .filetypes import material_type_for_extension
+from .storage import blob_content_hash, file_content_hash, material_storage
+
+
+class PostgresGinIndex(GinIndex):
+    """
+    GIN index that is only built on PostgreSQL. Other databases have no GIN
+    indexes and keep scanning the table.
+    """
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor != "postgresql":
+            return Statement("")
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if schema_editor.connection.vendor != "postgresql":
+            return Statement("")
+        return super().remove_sql(model, schema_editor, **kwargs)
+
 
 class CustomUser(AbstractUser):
     email = models.EmailField(unique=True)
     is_email_verified = models.BooleanField(default=False)
-    email_verification_token = models.CharField(max_length=100, blank=True, null=True)
     email_verification_sent_at = models.DateTimeField(blank=True, null=True)
     
     groups = models.ManyToManyField(Group, related_name="customuser_groups", blank=True)
@@ -21,10 +52,58 @@ class CustomUser(AbstractUser):
         Permission, related_name="customuser_permissions", blank=True
     )
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive login lookups (see resolve_login_user)
+            models.Index(Lower("username"), name="customuser_username_lower_idx"),
+            models.Index(Lower("email"), name="customuser_email_lower_idx"),
+        ]
+
     def __str__(self):
         return self.username
 
 
+class EmailVerificationToken(models.Model):
+    """
+    Pending email verification. Only the SHA-256 of the emailed token is
+    stored, so lookups go through the unique index on token_hash.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="email_verification_tokens"
+    )
+    token_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.user} (expires {self.expires_at:%Y-%m-%d %H:%M})"
+
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user):
+        """Replace the user's pending tokens with a new one and return the raw token"""
+        token = secrets.token_urlsafe(32)
+        cls.objects.filter(user=user).delete()
+        cls.objects.create(
+            user=user,
+            token_hash=cls.hash_token(token),
+            expires_at=timezone.now() + timedelta(hours=settings.EMAIL_VERIFICATION_TOKEN_LIFETIME),
+        )
+        return token
+
+    @classmethod
+    def lookup(cls, token):
+        """Return the stored token matching a raw token, or None"""
+        return cls.objects.select_related("user").filter(token_hash=cls.hash_token(token)).first()
+
+    @property
+    def is_expired(self):
+        return timezone.now() > self.expires_at
+
+
 class Profile(models.Model):
     USER_ROLES = [
         ("Student", "Student"),
@@ -161,8 +240,12 @@ class Course(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Maintained by courses.search; only populated on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ["name"]
+        indexes = [PostgresGinIndex(fields=["search_vector"], name="courses_course_search_idx")]
 
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -226,8 +309,13 @@ class CourseMaterial(models.Model):
     title = models.CharField(max_length=255, help_text="Material title/name")
     description = models.TextField(blank=True, null=True, help_text="Brief description of the material")
     material_type = models.CharField(max_length=20, choices=MATERIAL_TYPE_CHOICES, default='other')
-    file = models.FileField(upload_to=course_material_upload_path, help_text="Upload file (video, PDF, CSV, etc.)")
+    file = models.FileField(
+        upload_to=course_material_upload_path,
+        storage=material_storage,
+        help_text="Upload file (video, PDF, CSV, etc.)"
+    )
     file_size = models.BigIntegerField(blank=True, null=True, help_text="File size in bytes")
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, help_text="SHA-256 of the file contents")
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='uploaded_materials')
     uploaded_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -239,30 +327,18 @@ class CourseMaterial(models.Model):
         """Auto-detect material type based on file extension"""
         if not self.file:
             return 'other'
-        
-        ext = self.get_file_extension().lower()
-        
-        # Video extensions
-        if ext in ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm', '.m4v']:
-            return 'video'
-        
-        # Document extensions (PDF, Word, PowerPoint, etc.)
-        elif ext in ['.pdf', '.doc', '.docx', '.ppt', '.pptx', '.txt', '.rtf', '.odt']:
-            return 'document'
-        
-        # Spreadsheet extensions
-        elif ext in ['.csv', '.xls', '.xlsx', '.ods']:
-            return 'spreadsheet'
-        
-        # Archive extensions
-        elif ext in ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2']:
-            return 'archive'
-        
-        return 'other'
+        return material_type_for_extension(self.file.name)
     
     def save(self, *args, **kwargs):
         if self.file:
-            self.file_size = self.file.size
+            # Only ask the storage for the size of a newly assigned file
+            if self.file_size is None or not self.file._committed:
+                self.file_size = self.file.size
+            if not self.file._committed:
+                # Also used by the storage to pick the blob name
+                self.content_hash = file_content_hash(self.file.file)
+            elif not self.content_hash:
+                self.content_hash = blob_content_hash(self.file.name)
             
             # Auto-detect material type if not set or set to 'other'
             if not self.material_type or self.material_type == 'other':
@@ -281,7 +357,6 @@ class CourseMaterial(models.Model):
         return f"{self.course.name} - {self.title}"
     
     def get_file_extension(self):
-        import os
         return os.path.splitext(self.file.name)[1].lower()
     
     def get_file_size_display(self):
@@ -294,6 +369,66 @@ class CourseMaterial(models.Model):
         return f"{size:.2f} TB"
 
 
+class StoredBlob(models.Model):
+    """
+    A file kept once in ContentAddressedStorage. ref_count is the number of
+    course materials using it; unreferenced blobs are removed by gc_blobs.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} reference(s))"
+
+
+class UploadSession(models.Model):
+    """
+    A chunked, resumable upload of a course material. Chunks are appended to
+    a staging file in UPLOAD_STAGING_DIR until `received` reaches `size`;
+    finalizing turns the staging file into a CourseMaterial.
+    """
+    STATUS_CHOICES = [
+        ("uploading", "Uploading"),
+        ("complete", "Complete"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="upload_sessions")
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True, null=True)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text="Total size of the file in bytes")
+    received = models.BigIntegerField(default=0, help_text="Bytes stored so far")
+    writing_until = models.DateTimeField(
+        null=True, blank=True, help_text="Lease of the chunk being written, if any"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="uploading")
+    material = models.OneToOneField(
+        CourseMaterial, on_delete=models.SET_NULL, null=True, blank=True, related_name="upload_session"
+    )
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="upload_sessions"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def save(self, *args, **kwargs):
+        if not self.expires_at:
+            self.expires_at = timezone.now() + timedelta(hours=settings.UPLOAD_SESSION_LIFETIME)
+        super().save(*args, **kwargs)
+
+    @property
+    def staging_path(self):
+        return os.path.join(settings.UPLOAD_STAGING_DIR, f"{self.pk}.part")
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+
 class Alumni(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     graduation_year = models.IntegerField(
@@ -312,8 +447,12 @@ class Alumni(models.Model):
         related_name="alumni",
     )
 
+    # Maintained by courses.search; only populated on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ["-graduation_year", "user__username"]
+        indexes = [PostgresGinIndex(fields=["search_vector"], name="courses_alumni_search_idx")]
 
     def __str__(self):
         return self.user.username
@@ -474,8 +613,20 @@ class Lesson(models.Model):
     )
     order = models.PositiveIntegerField(help_text="Order of the lesson in the module")
 
+    # Maintained by courses.search; only populated on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ["order"]
+        indexes = [
+            PostgresGinIndex(fields=["search_vector"], name="courses_lesson_search_idx"),
+            # content__icontains renders as UPPER("content"::text) LIKE ...
+            # on Postgres; a trigram index on that expression serves it
+            PostgresGinIndex(
+                OpClass(Upper(Cast("content", models.TextField())), name="gin_trgm_ops"),
+                name="lesson_content_trgm_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.module.title} - {self.title}"
@@ -485,6 +636,12 @@ class Student(models.Model):
     GENDER_CHOICES = [("Male", "Male"), ("Female", "Female"), ("Other", "Other")]
     DIPLOMA_LEVEL_CHOICES = [("PhD", "PhD"),("Master", "Master"),("Bachelor", "Bachelor"),("Secondary School", "Secondary School"), ("No Option", "No Option")]
     ENGLISH_LEVEL_CHOICES = [(i, str(i)) for i in range(1, 6)]
+    APPLICATION_STATUS_CHOICES = [
+        ("submitted", "Submitted"),
+        ("pending", "Pending"),
+        ("in_progress", "In Progress"),
+        ("approved", "Approved"),
+    ]
 
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="student", null=True, blank=True)
     email = models.EmailField(unique=True)
@@ -509,9 +666,49 @@ class Student(models.Model):
     courses = models.ManyToManyField("Course", related_name="students")
     schedules = models.ManyToManyField("LearningSchedule", related_name="students")
 
+    # Selection progress, denormalized from selection_steps and kept in sync
+    # by the StudentSelection signal handlers
+    application_status = models.CharField(
+        max_length=20, choices=APPLICATION_STATUS_CHOICES, default="submitted", db_index=True
+    )
+    total_steps = models.PositiveIntegerField(default=0)
+    completed_steps = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.email}"
 
+    @staticmethod
+    def compute_application_status(total_steps, completed_steps):
+        if total_steps == 0:
+            return "submitted"
+        if completed_steps == total_steps:
+            return "approved"
+        if completed_steps > 0:
+            return "in_progress"
+        return "pending"
+
+    @classmethod
+    def refresh_application_status(cls, student_id):
+        """Recompute the selection progress of one student from its steps"""
+        counts = StudentSelection.objects.filter(student_id=student_id).aggregate(
+            total=models.Count("id"),
+            completed=models.Count("id", filter=models.Q(status="Completed")),
+        )
+        cls.objects.filter(pk=student_id).update(
+            total_steps=counts["total"],
+            completed_steps=counts["completed"],
+            application_status=cls.compute_application_status(counts["total"], counts["completed"]),
+        )
+
+
+class RegisterNumberSequence(models.Model):
+    """Last student register number handed out for a year"""
+    year = models.PositiveIntegerField(unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.year}: {self.last_value}"
+
 
 class CourseEnrollment(models.Model):
     STATUS_CHOICES = [
@@ -530,6 +727,10 @@ class CourseEnrollment(models.Model):
     class Meta:
         unique_together = ["student", "course"]
         ordering = ["-applied_at"]
+        indexes = [
+            # Keyset pagination of the admin enrollment list
+            models.Index(fields=["-applied_at"], name="enrollment_applied_at_idx"),
+        ]
     
     def __str__(self):
         return f"{self.student.first_name} - {self.course.name} ({self.status})"
@@ -570,3 +771,112 @@ class EventAttendance(models.Model):
     attended = models.BooleanField(default=False)
 
 
+class StatsSnapshot(models.Model):
+    """Precomputed dashboard statistics, one row per dashboard"""
+    key = models.CharField(max_length=50, unique=True)
+    data = models.JSONField(default=dict)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.key} @ {self.computed_at:%Y-%m-%d %H:%M}"
+
+
+class ThrottleCounter(models.Model):
+    """Request count of one client and throttle scope in the current window"""
+    key = models.CharField(max_length=255, unique=True)
+    window_start = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key}: {self.count}"
+
+
+class OutboundEmail(models.Model):
+    """Outgoing email queued by the request path and delivered by the send_queued_email worker"""
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("sending", "Sending"),  # claimed by a worker until next_attempt_at
+        ("sent", "Sent"),
+        ("failed", "Failed"),  # dead-lettered after too many attempts
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    content_subtype = models.CharField(max_length=20, default="plain")
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    reply_to = models.JSONField(default=list, blank=True)
+    # Bodies carrying secrets (e.g. verification links) are cleared once
+    # the email has been sent or dead-lettered
+    sensitive = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["next_attempt_at"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outboundemail_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+    @classmethod
+    def from_message(cls, message, sensitive=False):
+        return cls(
+            sensitive=sensitive,
+            subject=message.subject,
+            body=message.body,
+            content_subtype=message.content_subtype,
+            from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+            to=list(message.to),
+            reply_to=list(message.reply_to),
+        )
+
+    def to_message(self, connection=None):
+        message = EmailMessage(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to,
+            reply_to=self.reply_to,
+            connection=connection,
+        )
+        message.content_subtype = self.content_subtype
+        return message
+
+
+class ImageVariants(models.Model):
+    """
+    Resized WebP/JPEG renditions of one stored image, queued when the image
+    is saved and rendered by the process_image_variants worker
+    """
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("ready", "Ready"),
+        ("failed", "Failed"),
+    ]
+
+    source = models.CharField(max_length=255, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    # A worker's claim on a processing row; it is picked up again afterwards
+    claimed_until = models.DateTimeField(blank=True, null=True)
+    # {format: {width: storage name}}
+    variants = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="imagevariants_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.source} ({self.status})"
@@ -0,0 +1,87 @@
+"""
+Full-text search over stored search vectors
+
+Course, Lesson and Alumni keep a weighted tsvector in their search_vector
+column, refreshed by signal handlers after every write and indexed with GIN
+(migration 0039). FullTextSearchFilter is a drop-in replacement for DRF's
+SearchFilter that matches ?search= against that column and ranks the
+results. On databases other than PostgreSQL the vectors are left empty and
+the filter falls back to SearchFilter's icontains over search_fields.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, OuterRef, Subquery
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+from .models import Alumni, Course, Lesson
+
+
+def _vector(*weighted):
+    vectors = [
+        SearchVector(expression, weight=weight, config=settings.SEARCH_CONFIG)
+        for expression, weight in weighted
+    ]
+    combined = vectors[0]
+    for vector in vectors[1:]:
+        combined = combined + vector
+    return combined
+
+
+def course_vector():
+    return _vector(("name", "A"), ("software_tools", "B"), ("description", "C"))
+
+
+def lesson_vector():
+    return _vector(("title", "A"), ("description", "B"), ("content", "C"))
+
+
+def alumni_vector():
+    username = Subquery(get_user_model().objects.filter(pk=OuterRef("user_id")).values("username")[:1])
+    return _vector((username, "A"), ("current_position", "A"), ("success_story", "B"))
+
+
+SEARCH_VECTORS = {
+    Course: course_vector,
+    Lesson: lesson_vector,
+    Alumni: alumni_vector,
+}
+
+
+def supports_search_vectors(model):
+    return connections[model.objects.db].vendor == "postgresql"
+
+
+def update_search_vectors(model, pks=None):
+    """
+    Recompute the stored vector of the given rows (all rows when pks is
+    None) with a single UPDATE. Returns the number of rows updated.
+    """
+    if not supports_search_vectors(model):
+        return 0
+    queryset = model.objects.all() if pks is None else model.objects.filter(pk__in=pks)
+    return queryset.update(search_vector=SEARCH_VECTORS[model]())
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    SearchFilter that uses the queryset model's stored search vector on
+    PostgreSQL. Without an explicit ?ordering= results are ordered by rank,
+    so list it after OrderingFilter in filter_backends.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or queryset.model not in SEARCH_VECTORS or not supports_search_vectors(queryset.model):
+            return super().filter_queryset(request, queryset, view)
+
+        query = SearchQuery(" ".join(terms), search_type="websearch", config=settings.SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F("search_vector"), query)
+        )
+        if api_settings.ORDERING_PARAM not in request.query_params:
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+            queryset = queryset.order_by("-search_rank", *ordering)
+        return queryset
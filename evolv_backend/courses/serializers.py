@@ -1,4 +1,7 @@
+import os
+
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db.models import Q
 from django.utils import timezone
@@ -26,7 +29,12 @@ from .models import (
     Review,
     Module,
     Lesson,
+    UploadSession,
 )
+from .dynamic_fields import DynamicFieldsMixin
+from .images import ImageVariantsField
+from .stats import COURSE_COUNT_FIELDS, CategoryCourseCounts
+from .utils import allocate_register_numbers
 
 User = get_user_model()
 
@@ -41,10 +49,11 @@ class UserSerializer(serializers.ModelSerializer):
 class ProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     role = serializers.CharField(read_only=True)
+    profile_picture_variants = ImageVariantsField(source="profile_picture")
 
     class Meta:
         model = Profile
-        fields = ["id", "user", "role", "profile_picture", "title", "bio", "email", "twitter_url", "linkedin_url"]
+        fields = ["id", "user", "role", "profile_picture", "profile_picture_variants", "title", "bio", "email", "twitter_url", "linkedin_url"]
 
 
 class ProfileSelfSerializer(serializers.ModelSerializer):
@@ -57,10 +66,11 @@ class ProfileSelfSerializer(serializers.ModelSerializer):
     )
     user_email = serializers.EmailField(source="user.email", required=False)
     role = serializers.CharField(read_only=True)
+    profile_picture_variants = ImageVariantsField(source="profile_picture")
 
     class Meta:
         model = Profile
-        fields = ["id", "role", "username", "first_name", "last_name", "user_email", "email", "profile_picture", "title", "bio", "twitter_url", "linkedin_url"]
+        fields = ["id", "role", "username", "first_name", "last_name", "user_email", "email", "profile_picture", "profile_picture_variants", "title", "bio", "twitter_url", "linkedin_url"]
 
     def validate(self, attrs):
         user_data = attrs.get("user", {})
@@ -233,13 +243,27 @@ class LocationSerializer(serializers.ModelSerializer):
 
 class CourseCategorySerializer(serializers.ModelSerializer):
     course_count = serializers.SerializerMethodField()
+    course_stats = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(source='image')
     
     class Meta:
         model = CourseCategory
-        fields = ['id', 'name', 'description', 'icon', 'image', 'color', 'is_active', 'order', 'course_count', 'created_at']
+        fields = ['id', 'name', 'description', 'icon', 'image', 'image_variants', 'color', 'is_active', 'order', 'course_count', 'course_stats', 'created_at']
+
+    def _get_course_counts(self, obj):
+        # Use counts annotated by the view's queryset when available,
+        # otherwise share one grouped aggregate across the whole response
+        if hasattr(obj, "course_count"):
+            return {field: getattr(obj, field) for field in COURSE_COUNT_FIELDS}
+        counts = self.context.setdefault("category_course_counts", CategoryCourseCounts())
+        return counts.get(obj.pk)
     
     def get_course_count(self, obj):
-        return obj.courses.count()
+        return self._get_course_counts(obj)["course_count"]
+
+    def get_course_stats(self, obj):
+        counts = self._get_course_counts(obj)
+        return {key: counts[field] for field, key in COURSE_COUNT_FIELDS.items()}
 
 
 class PartnerSerializer(serializers.ModelSerializer):
@@ -256,7 +280,16 @@ class PartnerSerializer(serializers.ModelSerializer):
         return value
 
 
-class CourseReadSerializer(serializers.ModelSerializer):
+class CourseSummarySerializer(serializers.ModelSerializer):
+    category = serializers.CharField(source="category.name", read_only=True)
+
+    class Meta:
+        model = Course
+        fields = ["id", "name", "category"]
+        read_only_fields = fields
+
+
+class CourseReadSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     category_details = CourseCategorySerializer(source='category', read_only=True)
     category = serializers.CharField(source='category.name', read_only=True)  # For backward compatibility
     instructor = serializers.StringRelatedField()
@@ -266,6 +299,14 @@ class CourseReadSerializer(serializers.ModelSerializer):
     parent = serializers.StringRelatedField()
     parent_id = serializers.PrimaryKeyRelatedField(source="parent", read_only=True)
 
+    expandable_fields = {
+        "instructor": (UserSerializer, {}),
+        "locations": (LocationSerializer, {"many": True}),
+        "partners": (PartnerSerializer, {"many": True}),
+        "parent": (CourseSummarySerializer, {}),
+    }
+    field_dependencies = {"parent": ["parent__parent"]}
+
     class Meta:
         model = Course
         fields = [
@@ -412,6 +453,45 @@ class CourseMaterialSerializer(serializers.ModelSerializer):
         return None
 
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            "id",
+            "course",
+            "title",
+            "description",
+            "filename",
+            "size",
+            "received",
+            "chunk_size",
+            "status",
+            "material",
+            "created_at",
+            "expires_at",
+        ]
+        read_only_fields = ["received", "status", "material", "created_at", "expires_at"]
+
+    def get_chunk_size(self, obj):
+        return settings.UPLOAD_CHUNK_SIZE
+
+    def validate_filename(self, value):
+        # Only the base name is kept; the storage decides the directory
+        name = os.path.basename(value.replace("\\", "/"))
+        if not name:
+            raise serializers.ValidationError("A file name is required.")
+        return name
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Size must be positive.")
+        if value > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Files are limited to {settings.UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+
 class SelectionProcedureSerializer(serializers.ModelSerializer):
     class Meta:
         model = SelectionProcedure
@@ -436,11 +516,17 @@ class EventAttendanceSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class AlumniReadSerializer(serializers.ModelSerializer):
+class AlumniReadSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     course = serializers.StringRelatedField()
     location = serializers.StringRelatedField()
 
+    expandable_fields = {
+        "course": (CourseSummarySerializer, {}),
+        "location": (LocationSerializer, {}),
+    }
+    field_dependencies = {"course": ["course__parent"]}
+
     class Meta:
         model = Alumni
         fields = [
@@ -485,11 +571,19 @@ class AlumniWriteSerializer(serializers.ModelSerializer):
         return value
 
 
-class EventReadSerializer(serializers.ModelSerializer):
+class EventReadSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     location = serializers.StringRelatedField()
     course = serializers.StringRelatedField()
     partners = serializers.StringRelatedField(many=True)
     image = serializers.ImageField(read_only=True)
+    image_variants = ImageVariantsField(source="image")
+
+    expandable_fields = {
+        "location": (LocationSerializer, {}),
+        "course": (CourseSummarySerializer, {}),
+        "partners": (PartnerSerializer, {"many": True}),
+    }
+    field_dependencies = {"course": ["course__parent"]}
 
     class Meta:
         model = Event
@@ -503,6 +597,7 @@ class EventReadSerializer(serializers.ModelSerializer):
             "course",
             "partners",
             "image",
+            "image_variants",
         ]
 
 
@@ -552,6 +647,8 @@ class EventWriteSerializer(serializers.ModelSerializer):
 
 
 class AboutUsSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField(source="image")
+
     class Meta:
         model = AboutUs
         fields = "__all__"
@@ -614,6 +711,7 @@ class TeamMemberWriteSerializer(serializers.ModelSerializer):
 
 class TeamMemberReadSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(source="image")
 
     class Meta:
         model = TeamMember
@@ -623,6 +721,7 @@ class TeamMemberReadSerializer(serializers.ModelSerializer):
             "name",
             "role",
             "image",
+            "image_variants",
             "bio",
             "linkedin",
             "twitter",
@@ -668,6 +767,9 @@ class LearningScheduleSerializer(serializers.ModelSerializer):
     location_name = serializers.CharField(source='location.name', read_only=True)
     instructor_name = serializers.SerializerMethodField(read_only=True)
 
+    # Read by instructor_name when nested in a DynamicFieldsMixin serializer
+    field_dependencies = {"instructor_name": ["instructor"]}
+
     class Meta:
         model = LearningSchedule
         fields = [
@@ -726,11 +828,12 @@ class ModuleReadSerializer(serializers.ModelSerializer):
         fields = ["id", "schedule", "title", "description", "order", "lessons", "lessons_count"]
     
     def get_lessons(self, obj):
+        # .all() reuses lessons prefetched by the view
         lessons = obj.lessons.all()
-        return LessonReadSerializer(lessons, many=True).data
-    
+        return LessonReadSerializer(lessons, many=True, context=self.context).data
+
     def get_lessons_count(self, obj):
-        return obj.lessons.count()
+        return len(obj.lessons.all())
 
 
 class ModuleWriteSerializer(serializers.ModelSerializer):
@@ -770,6 +873,13 @@ class LessonReadSerializer(serializers.ModelSerializer):
         ]
 
 
+class LessonListSerializer(LessonReadSerializer):
+    """Lesson without its content, which lists leave to the content endpoint"""
+
+    class Meta(LessonReadSerializer.Meta):
+        fields = ["id", "module", "title", "description", "resources", "order"]
+
+
 class LessonWriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Lesson
@@ -800,6 +910,51 @@ class LessonWriteSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class CurriculumLessonSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Lesson
+        fields = ["id", "title", "description", "resources", "order"]
+
+
+class CurriculumModuleSerializer(serializers.ModelSerializer):
+    lessons = CurriculumLessonSerializer(many=True, read_only=True)
+    lessons_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Module
+        fields = ["id", "title", "description", "order", "lessons_count", "lessons"]
+
+    def get_lessons_count(self, obj):
+        return len(obj.lessons.all())
+
+
+class CurriculumSerializer(serializers.ModelSerializer):
+    """A schedule with its modules and their lessons, for prefetched schedules"""
+    course_name = serializers.CharField(source="course.name", read_only=True)
+    modules = CurriculumModuleSerializer(many=True, read_only=True)
+    modules_count = serializers.SerializerMethodField()
+    lessons_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LearningSchedule
+        fields = [
+            "id",
+            "course",
+            "course_name",
+            "start_date",
+            "end_date",
+            "modules_count",
+            "lessons_count",
+            "modules",
+        ]
+
+    def get_modules_count(self, obj):
+        return len(obj.modules.all())
+
+    def get_lessons_count(self, obj):
+        return sum(len(module.lessons.all()) for module in obj.modules.all())
+
+
 class CourseEnrollmentSerializer(serializers.ModelSerializer):
     course_name = serializers.CharField(source='course.name', read_only=True)
     course_id = serializers.IntegerField(source='course.id', read_only=True)
@@ -811,12 +966,22 @@ class CourseEnrollmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'applied_at', 'updated_at']
 
 
-class StudentReadSerializer(serializers.ModelSerializer):
+class StudentReadSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     courses = serializers.StringRelatedField(many=True)
     enrollments = CourseEnrollmentSerializer(many=True, read_only=True)
     schedules = serializers.StringRelatedField(many=True)
     user = serializers.SerializerMethodField()
 
+    expandable_fields = {
+        "courses": (CourseSummarySerializer, {"many": True}),
+        "schedules": (LearningScheduleSerializer, {"many": True}),
+    }
+    field_dependencies = {
+        "user": ["user"],
+        "courses": ["courses__parent"],
+        "schedules": ["schedules__course"],
+    }
+
     class Meta:
         model = Student
         fields = "__all__"
@@ -844,7 +1009,7 @@ class StudentWriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = "__all__"
-        read_only_fields = ["id"]
+        read_only_fields = ["id", "application_status", "total_steps", "completed_steps"]
 
     def validate_courses(self, value):
         """Filter out None values from courses list"""
@@ -888,18 +1053,15 @@ class StudentWriteSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         courses = validated_data.pop("courses", [])
         schedules = validated_data.pop("schedules", [])
+        if not validated_data.get("register_number"):
+            validated_data["register_number"] = allocate_register_numbers()[0]
         student = super().create(validated_data)
         
         # Set courses using the ManyToMany field
         if courses:
             student.courses.set(courses)
             # Also create CourseEnrollment entries with default "Pending" status
-            for course in courses:
-                CourseEnrollment.objects.get_or_create(
-                    student=student,
-                    course=course,
-                    defaults={'status': 'Pending'}
-                )
+            self._sync_enrollments(student, courses, existing=set())
         
         if schedules:
             student.schedules.set(schedules)
@@ -916,25 +1078,61 @@ class StudentWriteSerializer(serializers.ModelSerializer):
         # Update courses using the ManyToMany field
         if courses is not None:
             student.courses.set(courses)
-            # Also create/update CourseEnrollment entries
-            for course in courses:
-                CourseEnrollment.objects.get_or_create(
-                    student=student,
-                    course=course,
-                    defaults={'status': 'Pending'}
-                )
+            # Also create/drop CourseEnrollment entries
+            self._sync_enrollments(student, courses, drop_missing=True)
         
         if schedules is not None:
             student.schedules.set(schedules)
         return student
 
+    def _sync_enrollments(self, student, courses, existing=None, drop_missing=False):
+        """
+        Create "Pending" enrollments for courses the student is not yet
+        enrolled in. With drop_missing, pending enrollments for courses no
+        longer selected are removed; reviewed ones are kept as a record.
+        """
+        course_ids = {course.pk for course in courses}
+        if existing is None:
+            existing = set(
+                CourseEnrollment.objects.filter(student=student).values_list("course_id", flat=True)
+            )
+
+        missing = course_ids - existing
+        if missing:
+            # ignore_conflicts relies on the (student, course) unique constraint
+            # when a concurrent request enrolled the same course first
+            CourseEnrollment.objects.bulk_create(
+                [CourseEnrollment(student=student, course_id=course_id, status="Pending") for course_id in missing],
+                ignore_conflicts=True,
+            )
 
+        if drop_missing and existing - course_ids:
+            CourseEnrollment.objects.filter(
+                student=student, status="Pending", course_id__in=existing - course_ids
+            ).delete()
 
 
-class CourseEnrollmentSerializer(serializers.ModelSerializer):
-    student = StudentReadSerializer(read_only=True)
-    course = CourseReadSerializer(read_only=True)
-    
+
+
+class AdminEnrollmentStudentSerializer(serializers.ModelSerializer):
+    """Applicant details shown next to an enrollment, without nested relations"""
+
+    class Meta:
+        model = Student
+        fields = [
+            "id", "first_name", "last_name", "email", "phone", "gender", "birth_date",
+            "country_of_birth", "nationality", "register_number", "diploma_level", "job_status",
+            "english_level", "motivation", "future_goals", "proudest_moment", "how_heard",
+            "referral_person", "has_laptop", "application_status",
+        ]
+        read_only_fields = fields
+
+
+class AdminEnrollmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Enrollment as listed to admins, without nested relations"""
+    student = AdminEnrollmentStudentSerializer(read_only=True)
+    course = CourseSummarySerializer(read_only=True)
+
     class Meta:
         model = CourseEnrollment
         fields = ['id', 'student', 'course', 'status', 'applied_at', 'updated_at']
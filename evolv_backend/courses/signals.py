@@ -0,0 +1,197 @@
+"""
+Signal handlers that keep caches, search vectors, blob reference counts and
+image variants in sync with model changes
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .cache import CATALOG_NAMESPACE, bump_version, calendar_namespace, curriculum_namespace
+from .images import IMAGE_FIELDS, enqueue_image_variants
+from .models import (
+    Alumni, Course, CourseCategory, CourseMaterial, Event, EventAttendance, LearningSchedule, Lesson, Location,
+    Module, Partner, Student, StudentSelection, StoredBlob,
+)
+from .search import SEARCH_VECTORS, update_search_vectors
+
+
+def bump_catalog_version(sender, **kwargs):
+    if kwargs.get("action", "post_").startswith("pre_"):
+        return
+    # Bump after commit so a concurrent request can't cache pre-commit data
+    # under the new version
+    transaction.on_commit(lambda: bump_version(CATALOG_NAMESPACE))
+
+
+for model in (Course, CourseCategory, Location, Partner):
+    post_save.connect(bump_catalog_version, sender=model, dispatch_uid=f"catalog_save_{model.__name__}")
+    post_delete.connect(bump_catalog_version, sender=model, dispatch_uid=f"catalog_delete_{model.__name__}")
+
+for through in (Course.locations.through, Course.partners.through):
+    m2m_changed.connect(bump_catalog_version, sender=through, dispatch_uid=f"catalog_m2m_{through.__name__}")
+
+
+def remember_selection_student(sender, instance, **kwargs):
+    # A step moved to another student also changes the previous student's counts
+    instance._previous_student_id = None
+    if instance.pk:
+        instance._previous_student_id = (
+            StudentSelection.objects.filter(pk=instance.pk).values_list("student_id", flat=True).first()
+        )
+
+
+def refresh_application_status(sender, instance, **kwargs):
+    Student.refresh_application_status(instance.student_id)
+    previous = getattr(instance, "_previous_student_id", None)
+    if previous is not None and previous != instance.student_id:
+        Student.refresh_application_status(previous)
+
+
+pre_save.connect(remember_selection_student, sender=StudentSelection, dispatch_uid="student_selection_pre_save")
+post_save.connect(refresh_application_status, sender=StudentSelection, dispatch_uid="student_selection_save")
+post_delete.connect(refresh_application_status, sender=StudentSelection, dispatch_uid="student_selection_delete")
+
+
+def _local(value):
+    # Django only warns when a naive datetime is saved, so don't fail here
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return timezone.localtime(value)
+
+
+def bump_calendar_version(*dates):
+    namespaces = {
+        calendar_namespace(local.year, local.month)
+        for local in (_local(d) for d in dates if d is not None)
+    }
+    for namespace in namespaces:
+        transaction.on_commit(lambda namespace=namespace: bump_version(namespace))
+
+
+def remember_event_date(sender, instance, **kwargs):
+    # A rescheduled event also leaves the month it was previously in
+    instance._previous_date = None
+    if instance.pk:
+        instance._previous_date = (
+            Event.objects.filter(pk=instance.pk).values_list("date", flat=True).first()
+        )
+
+
+def event_changed(sender, instance, **kwargs):
+    bump_calendar_version(instance.date, getattr(instance, "_previous_date", None))
+
+
+def event_attendance_changed(sender, instance, **kwargs):
+    date = Event.objects.filter(pk=instance.event_id).values_list("date", flat=True).first()
+    bump_calendar_version(date)
+
+
+pre_save.connect(remember_event_date, sender=Event, dispatch_uid="calendar_event_pre_save")
+post_save.connect(event_changed, sender=Event, dispatch_uid="calendar_event_save")
+post_delete.connect(event_changed, sender=Event, dispatch_uid="calendar_event_delete")
+post_save.connect(event_attendance_changed, sender=EventAttendance, dispatch_uid="calendar_attendance_save")
+post_delete.connect(event_attendance_changed, sender=EventAttendance, dispatch_uid="calendar_attendance_delete")
+
+
+def bump_curriculum_version(*schedule_ids):
+    for schedule_id in {pk for pk in schedule_ids if pk is not None}:
+        namespace = curriculum_namespace(schedule_id)
+        transaction.on_commit(lambda namespace=namespace: bump_version(namespace))
+
+
+def remember_module_schedule(sender, instance, **kwargs):
+    # A module moved to another schedule also leaves the old curriculum
+    instance._previous_schedule_id = None
+    if instance.pk:
+        instance._previous_schedule_id = (
+            Module.objects.filter(pk=instance.pk).values_list("schedule_id", flat=True).first()
+        )
+
+
+def module_changed(sender, instance, **kwargs):
+    bump_curriculum_version(instance.schedule_id, getattr(instance, "_previous_schedule_id", None))
+
+
+def remember_lesson_schedule(sender, instance, **kwargs):
+    instance._previous_schedule_id = None
+    if instance.pk:
+        instance._previous_schedule_id = (
+            Lesson.objects.filter(pk=instance.pk).values_list("module__schedule_id", flat=True).first()
+        )
+
+
+def lesson_changed(sender, instance, **kwargs):
+    schedule_id = Module.objects.filter(pk=instance.module_id).values_list("schedule_id", flat=True).first()
+    bump_curriculum_version(schedule_id, getattr(instance, "_previous_schedule_id", None))
+
+
+def schedule_changed(sender, instance, **kwargs):
+    bump_curriculum_version(instance.pk)
+
+
+pre_save.connect(remember_module_schedule, sender=Module, dispatch_uid="curriculum_module_pre_save")
+post_save.connect(module_changed, sender=Module, dispatch_uid="curriculum_module_save")
+post_delete.connect(module_changed, sender=Module, dispatch_uid="curriculum_module_delete")
+pre_save.connect(remember_lesson_schedule, sender=Lesson, dispatch_uid="curriculum_lesson_pre_save")
+post_save.connect(lesson_changed, sender=Lesson, dispatch_uid="curriculum_lesson_save")
+post_delete.connect(lesson_changed, sender=Lesson, dispatch_uid="curriculum_lesson_delete")
+post_save.connect(schedule_changed, sender=LearningSchedule, dispatch_uid="curriculum_schedule_save")
+post_delete.connect(schedule_changed, sender=LearningSchedule, dispatch_uid="curriculum_schedule_delete")
+
+
+def refresh_search_vector(sender, instance, **kwargs):
+    update_search_vectors(sender, [instance.pk])
+
+
+def refresh_alumni_search_vector(sender, instance, update_fields=None, **kwargs):
+    # Alumni vectors include the username; logins only touch last_login
+    if update_fields is not None and "username" not in update_fields:
+        return
+    update_search_vectors(Alumni, Alumni.objects.filter(user_id=instance.pk).values("pk"))
+
+
+for model in SEARCH_VECTORS:
+    post_save.connect(refresh_search_vector, sender=model, dispatch_uid=f"search_vector_save_{model.__name__}")
+
+post_save.connect(refresh_alumni_search_vector, sender=get_user_model(), dispatch_uid="search_vector_save_user")
+
+
+def adjust_blob_references(name, delta):
+    if name:
+        StoredBlob.objects.filter(name=name).update(
+            ref_count=F("ref_count") + delta, updated_at=timezone.now()
+        )
+
+
+def remember_material_file(sender, instance, **kwargs):
+    instance._previous_file = None
+    if instance.pk:
+        instance._previous_file = (
+            CourseMaterial.objects.filter(pk=instance.pk).values_list("file", flat=True).first()
+        )
+
+
+def material_saved(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_file", None)
+    if instance.file.name != previous:
+        adjust_blob_references(instance.file.name, 1)
+        adjust_blob_references(previous, -1)
+
+
+def material_deleted(sender, instance, **kwargs):
+    adjust_blob_references(instance.file.name, -1)
+
+
+pre_save.connect(remember_material_file, sender=CourseMaterial, dispatch_uid="blob_material_pre_save")
+post_save.connect(material_saved, sender=CourseMaterial, dispatch_uid="blob_material_save")
+post_delete.connect(material_deleted, sender=CourseMaterial, dispatch_uid="blob_material_delete")
+
+
+def queue_image_variants(sender, instance, **kwargs):
+    enqueue_image_variants([getattr(instance, IMAGE_FIELDS[sender]).name])
+
+
+for model in IMAGE_FIELDS:
+    post_save.connect(queue_image_variants, sender=model, dispatch_uid=f"image_variants_save_{model.__name__}")
@@ -0,0 +1,146 @@
+"""
+Aggregated statistics shared by views and serializers
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from .models import Alumni, Course, Event, LearningSchedule, Review, StatsSnapshot, Student
+
+
+# Maps the annotation names to the keys exposed in API responses
+COURSE_COUNT_FIELDS = {
+    "course_count": "total",
+    "active_course_count": "active",
+    "top_level_course_count": "top_level",
+    "subcourse_count": "subcourses",
+}
+
+
+def course_count_expressions(prefix=""):
+    """
+    Build the Count expressions for the course statistics of a category.
+    `prefix` is the lookup path from the queried model to Course
+    (e.g. "courses__" when annotating CourseCategory).
+    """
+    # A course is active until its end date has passed
+    today = timezone.localdate()
+    active = Q(**{f"{prefix}end_date__isnull": True}) | Q(**{f"{prefix}end_date__gte": today})
+
+    return {
+        "course_count": Count(f"{prefix}id"),
+        "active_course_count": Count(f"{prefix}id", filter=active),
+        "top_level_course_count": Count(f"{prefix}id", filter=Q(**{f"{prefix}parent__isnull": True})),
+        "subcourse_count": Count(f"{prefix}id", filter=Q(**{f"{prefix}parent__isnull": False})),
+    }
+
+
+def annotate_course_counts(queryset):
+    """Annotate a CourseCategory queryset with its course counts"""
+    return queryset.annotate(**course_count_expressions("courses__"))
+
+
+class CategoryCourseCounts:
+    """
+    Course counts for every category, loaded with a single grouped
+    aggregate on first access and reused for the rest of the request.
+    """
+
+    def __init__(self):
+        self._counts = None
+
+    def _load(self):
+        if self._counts is None:
+            rows = (
+                Course.objects.order_by()
+                .values("category_id")
+                .annotate(**course_count_expressions())
+            )
+            self._counts = {row.pop("category_id"): row for row in rows}
+        return self._counts
+
+    def get(self, category_id):
+        counts = self._load().get(category_id)
+        if counts is None:
+            return {field: 0 for field in COURSE_COUNT_FIELDS}
+        return counts
+
+
+ADMIN_STATS_KEY = "admin_dashboard"
+
+
+def compute_admin_stats():
+    """Compute every admin dashboard counter, one aggregate per model"""
+    now = timezone.now()
+
+    students = Student.objects.aggregate(
+        total=Count("id"),
+        pending=Count("id", filter=~Q(application_status="approved")),
+    )
+    courses = Course.objects.aggregate(
+        active=Count("id", filter=Q(parent__isnull=True)),
+        subcourses=Count("id", filter=Q(parent__isnull=False)),
+    )
+    events = Event.objects.aggregate(
+        upcoming=Count("id", filter=Q(date__gte=now)),
+        past=Count("id", filter=Q(date__lt=now)),
+    )
+    active_schedules = LearningSchedule.objects.filter(end_date__gte=now.date()).count()
+    total_alumni = Alumni.objects.count()
+    reviews = Review.objects.aggregate(total=Count("id"), average=Avg("rating"))
+
+    return {
+        "students": {
+            "total": students["total"],
+            "pending_applications": students["pending"],
+            "approved": students["total"] - students["pending"],
+        },
+        "courses": {
+            "active": courses["active"],
+            "subcourses": courses["subcourses"],
+            "total": courses["active"] + courses["subcourses"],
+        },
+        "events": {
+            "upcoming": events["upcoming"],
+            "past": events["past"],
+            "total": events["upcoming"] + events["past"],
+        },
+        "schedules": {
+            "active": active_schedules,
+        },
+        "alumni": {
+            "total": total_alumni,
+        },
+        "reviews": {
+            "total": reviews["total"],
+            "average_rating": round(reviews["average"], 2) if reviews["average"] is not None else 0,
+        },
+    }
+
+
+def refresh_admin_stats():
+    """Recompute the admin dashboard snapshot and store it"""
+    snapshot, _ = StatsSnapshot.objects.update_or_create(
+        key=ADMIN_STATS_KEY,
+        defaults={"data": compute_admin_stats(), "computed_at": timezone.now()},
+    )
+    return snapshot
+
+
+def get_admin_stats(fresh=False):
+    """
+    Return the admin dashboard snapshot. It is only recomputed here when
+    asked to or when none exists yet; keeping it current is the job of
+    refresh_admin_stats (on a schedule or with --loop).
+    """
+    snapshot = None if fresh else StatsSnapshot.objects.filter(key=ADMIN_STATS_KEY).first()
+    if snapshot is None:
+        snapshot = refresh_admin_stats()
+    return snapshot
+
+
+def is_stale(snapshot):
+    """Whether a snapshot is older than ADMIN_STATS_MAX_AGE seconds"""
+    return snapshot.computed_at < timezone.now() - timedelta(seconds=settings.ADMIN_STATS_MAX_AGE)
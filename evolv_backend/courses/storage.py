@@ -0,0 +1,116 @@
+"""
+Content-addressed storage for course material files
+
+ContentAddressedStorage stores every file under a name derived from its
+SHA-256 (blobs/ab/cd/abcd...ef.pdf) on top of the default storage, so the
+same PDF or dataset uploaded to several courses is kept once. Each stored
+blob has a StoredBlob row whose ref_count is maintained by signal handlers
+on CourseMaterial. Deleting a material's file through the storage does
+nothing, since other materials may share it; blobs nobody references any
+more are removed by the gc_blobs management command.
+"""
+import hashlib
+import os
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import Storage, default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+HASH_BLOCK_SIZE = 64 * 1024
+
+
+def file_content_hash(content):
+    """
+    SHA-256 of a File, read in blocks. The digest is remembered on the
+    object so the model and the storage hash an upload only once.
+    """
+    cached = getattr(content, "content_hash", None)
+    if cached:
+        return cached
+
+    digest = hashlib.sha256()
+    if hasattr(content, "temporary_file_path"):
+        with open(content.temporary_file_path(), "rb") as source:
+            while block := source.read(HASH_BLOCK_SIZE):
+                digest.update(block)
+    else:
+        for block in content.chunks(HASH_BLOCK_SIZE):
+            digest.update(block)
+    content.content_hash = digest.hexdigest()
+    return content.content_hash
+
+
+def blob_name(content_hash, filename, prefix="blobs"):
+    ext = os.path.splitext(filename)[1].lower()
+    return f"{prefix}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{ext}"
+
+
+def blob_content_hash(name):
+    """Content hash encoded in a blob name, or "" for any other name"""
+    stem = os.path.splitext(os.path.basename(name or ""))[0]
+    if len(stem) == 64 and all(char in "0123456789abcdef" for char in stem):
+        return stem
+    return ""
+
+
+@deconstructible
+class ContentAddressedStorage(Storage):
+    """Deduplicating wrapper around the default storage"""
+
+    def __init__(self, prefix="blobs"):
+        self.prefix = prefix
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        content_hash = file_content_hash(content)
+        name = blob_name(content_hash, name or content.name, self.prefix)
+        StoredBlob = apps.get_model("courses", "StoredBlob")
+
+        # The locked row serializes uploads of the same content with each
+        # other and with gc_blobs, which deletes a blob's file while it
+        # holds the row. Under the lock the file either exists and is
+        # reused, or is written under exactly this name.
+        with transaction.atomic():
+            blob, created = StoredBlob.objects.select_for_update().get_or_create(
+                name=name, defaults={"content_hash": content_hash, "size": content.size}
+            )
+            if not created:
+                # Keeps a blob that is about to be referenced again out of
+                # gc_blobs
+                blob.updated_at = timezone.now()
+                blob.save(update_fields=["updated_at"])
+            if not default_storage.exists(name):
+                default_storage.save(name, content, max_length=max_length)
+        return name
+    def _open(self, name, mode="rb"):
+        return default_storage.open(name, mode)
+
+    def delete(self, name):
+        # Other materials may share the blob; gc_blobs removes it once
+        # nothing references it
+        pass
+
+    def exists(self, name):
+        return default_storage.exists(name)
+
+    def listdir(self, path):
+        return default_storage.listdir(path)
+
+    def size(self, name):
+        return default_storage.size(name)
+
+    def url(self, name):
+        return default_storage.url(name)
+
+    def path(self, name):
+        return default_storage.path(name)
+
+    def get_modified_time(self, name):
+        return default_storage.get_modified_time(name)
+
+
+material_storage = ContentAddressedStorage()
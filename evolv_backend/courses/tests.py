@@ -1,3 +1,1564 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import runpy
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
 
-# Create your tests here.
+from unittest import mock, skipIf, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .images import build_variants
+from .mail import deliver_queued_emails, queue_email, send_batch
+from .media_urls import sign_media_name
+from .models import (
+    Course,
+    CourseCategory,
+    CourseMaterial,
+    CourseEnrollment,
+    EmailVerificationToken,
+    Event,
+    EventAttendance,
+    ImageVariants,
+    LearningSchedule,
+    Lesson,
+    Location,
+    Module,
+    OutboundEmail,
+    Profile,
+    RegisterNumberSequence,
+    StoredBlob,
+    SelectionProcedure,
+    StatsSnapshot,
+    Student,
+    StudentSelection,
+    ThrottleCounter,
+    UploadSession,
+)
+from .serializers import StudentWriteSerializer
+from .throttles import get_throttle_metrics
+from .uploads import append_chunk, finalize_upload, inspect_staged_file
+from .utils import allocate_register_numbers, send_verification_email
+
+User = get_user_model()
+
+# Query budgets count the views' own queries, with throttles counted in a
+# cache shared by the workers as they are when REDIS_URL is set
+SHARED_CACHE_THROTTLES = override_settings(THROTTLE_STORE="courses.throttles.CacheThrottleStore")
+
+
+def student_fields(**kwargs):
+    data = {
+        "phone": "+35600000000",
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "gender": "Female",
+        "birth_date": date(2000, 1, 1),
+        "zip_code": "MSK1000",
+        "country_of_birth": "MT",
+        "nationality": "MT",
+        "diploma_level": "Bachelor",
+        "job_status": "Employed",
+        "motivation": "Motivation",
+        "future_goals": "Goals",
+        "proudest_moment": "Moment",
+        "english_level": 4,
+        "how_heard": "Friend",
+        "has_laptop": True,
+    }
+    data.update(kwargs)
+    return data
+
+
+def create_student(user, **kwargs):
+    return Student.objects.create(**student_fields(**{"user": user, "email": user.email, **kwargs}))
+
+
+def student_write_serializer(user, **kwargs):
+    """StudentWriteSerializer for a request made by `user`"""
+    request = APIRequestFactory().post("/")
+    request.user = user
+    return StudentWriteSerializer(context={"request": request}, **kwargs)
+
+
+@SHARED_CACHE_THROTTLES
+class CategoryCourseCountTests(TestCase):
+    # count + courses + locations + partners + one grouped category aggregate
+    COURSE_LIST_BUDGET = 5
+    # count + categories annotated with their course counts
+    CATEGORY_LIST_BUDGET = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = [CourseCategory.objects.create(name=f"Category {i}", order=i) for i in range(10)]
+        parent = Course.objects.create(name="Parent", category=cls.categories[0], description="", software_tools="")
+        Course.objects.create(
+            name="Child", category=cls.categories[0], parent=parent, description="", software_tools="",
+            end_date=date.today() - timedelta(days=1),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def add_courses(self, count):
+        Course.objects.bulk_create(
+            Course(name=f"Course {i}", category=self.categories[i % 10], description="", software_tools="")
+            for i in range(count)
+        )
+
+    def test_course_list_query_count_is_fixed(self):
+        url = reverse("courses:course-list")
+        with self.assertNumQueries(self.COURSE_LIST_BUDGET):
+            self.client.get(url)
+
+        self.add_courses(100)
+        with self.assertNumQueries(self.COURSE_LIST_BUDGET):
+            response = self.client.get(url)
+
+        self.assertEqual(response.data["count"], 102)
+        self.assertEqual(len({course["category_details"]["id"] for course in response.data["results"]}), 10)
+
+    def test_category_list_query_count_is_fixed(self):
+        url = reverse("courses:category-list")
+        with self.assertNumQueries(self.CATEGORY_LIST_BUDGET):
+            self.client.get(url)
+
+        self.add_courses(100)
+        with self.assertNumQueries(self.CATEGORY_LIST_BUDGET):
+            response = self.client.get(url)
+
+        first = response.data["results"][0]
+        self.assertEqual(first["course_count"], 12)
+        self.assertEqual(first["course_stats"], {"total": 12, "active": 11, "top_level": 11, "subcourses": 1})
+
+
+@SHARED_CACHE_THROTTLES
+class PublicCatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = CourseCategory.objects.create(name="Data & AI")
+        cls.location = Location.objects.create(name="Malta", location_type="Campus", country="Malta")
+        cls.course = Course.objects.create(name="Python", category=cls.category, description="", software_tools="")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse("courses:course-list") + "?public=true"
+
+    def test_repeat_visits_do_no_database_work(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(cached["ETag"], first["ETag"])
+
+        with self.assertNumQueries(0):
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_query_strings_are_cached_separately(self):
+        first = self.client.get(self.url)
+        other = self.client.get(self.url + "&search=nothing-matches")
+        self.assertNotEqual(other["ETag"], first["ETag"])
+        self.assertEqual(other.data["count"], 0)
+
+    def assert_invalidated_by(self, change):
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        return response
+
+    def test_course_changes_invalidate(self):
+        def rename():
+            self.course.name = "Python 101"
+            self.course.save()
+
+        response = self.assert_invalidated_by(rename)
+        self.assertEqual(response.data["results"][0]["name"], "Python 101")
+
+    def test_category_changes_invalidate(self):
+        def rename():
+            self.category.name = "Data"
+            self.category.save()
+
+        response = self.assert_invalidated_by(rename)
+        self.assertEqual(response.data["results"][0]["category_details"]["name"], "Data")
+
+    def test_location_m2m_changes_invalidate(self):
+        self.assert_invalidated_by(lambda: self.course.locations.add(self.location))
+
+    def test_non_public_lists_are_not_cached(self):
+        response = self.client.get(reverse("courses:course-list"))
+        self.assertNotIn("ETag", response)
+
+
+@SHARED_CACHE_THROTTLES
+class StudentDashboardQueryBudgetTests(TestCase):
+    # student + courses + enrollments + schedules + selection steps + events
+    QUERY_BUDGET = 6
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="ada", email="ada@example.com", password="secret-pass-123"
+        )
+        cls.student = create_student(cls.user)
+        cls.category = CourseCategory.objects.create(name="Data & AI")
+        cls.location = Location.objects.create(name="Malta", location_type="Campus", country="Malta")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("courses:student-dashboard")
+
+    def add_schedules(self, count):
+        for i in range(count):
+            course = Course.objects.create(
+                name=f"Course {i}",
+                category=self.category,
+                description="Description",
+                software_tools="Python",
+            )
+            schedule = LearningSchedule.objects.create(
+                course=course,
+                location=self.location,
+                start_date=date.today(),
+                end_date=date.today() + timedelta(days=90),
+            )
+            self.student.courses.add(course)
+            self.student.schedules.add(schedule)
+            CourseEnrollment.objects.create(student=self.student, course=course)
+
+    def add_steps(self, completed, pending):
+        for i in range(completed + pending):
+            step = SelectionProcedure.objects.create(step_name=f"Step {i}", description="", order=i)
+            StudentSelection.objects.create(
+                student=self.student,
+                step=step,
+                status="Completed" if i < completed else "Pending",
+            )
+
+    def test_query_count_does_not_grow_with_schedules(self):
+        self.add_schedules(1)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            self.client.get(self.url)
+
+        self.add_schedules(5)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["enrolled_schedules"]), 6)
+
+    def test_selection_progress_follows_steps(self):
+        self.add_steps(completed=2, pending=1)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data["application_status"], "in_progress")
+        self.assertEqual(response.data["selection_progress"]["total_steps"], 3)
+        self.assertEqual(response.data["selection_progress"]["completed_steps"], 2)
+        self.assertEqual(len(response.data["selection_progress"]["steps"]), 3)
+
+    def test_status_updates_when_steps_change(self):
+        self.add_steps(completed=0, pending=2)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.application_status, "pending")
+
+        self.student.selection_steps.update(status="Completed")
+        step = self.student.selection_steps.first()
+        step.save()
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.application_status, "approved")
+
+        step.delete()
+        self.student.refresh_from_db()
+        self.assertEqual((self.student.total_steps, self.student.completed_steps), (1, 1))
+
+    def test_moving_a_step_updates_both_students(self):
+        self.add_steps(completed=1, pending=1)
+        other = create_student(
+            User.objects.create_user(username="grace", email="grace@example.com", password="x"),
+            email="grace@example.com",
+        )
+
+        step = self.student.selection_steps.get(status="Pending")
+        step.student = other
+        step.save()
+
+        self.student.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(
+            (self.student.total_steps, self.student.completed_steps, self.student.application_status),
+            (1, 1, "approved"),
+        )
+        self.assertEqual((other.total_steps, other.completed_steps, other.application_status), (1, 0, "pending"))
+
+    def test_missing_student_profile(self):
+        other = User.objects.create_user(username="bob", email="bob@example.com", password="x")
+        self.client.force_authenticate(other)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(ADMIN_STATS_MAX_AGE=300)
+@SHARED_CACHE_THROTTLES
+class AdminDashboardStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="x")
+        category = CourseCategory.objects.create(name="Data & AI")
+        Course.objects.create(name="Python", category=category, description="", software_tools="")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse("courses:admin-dashboard")
+
+    def add_student(self, username):
+        create_student(User.objects.create_user(username=username, email=f"{username}@example.com", password="x"))
+
+    def test_served_from_the_snapshot(self):
+        call_command("refresh_admin_stats", stdout=mock.MagicMock())
+        self.add_student("ada")
+
+        # Only the snapshot row is read
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.data["courses"]["total"], 1)
+        self.assertEqual(response.data["students"]["total"], 0)
+        self.assertFalse(response.data["is_stale"])
+
+    def test_stale_snapshot_is_not_recomputed_on_the_request(self):
+        call_command("refresh_admin_stats", stdout=mock.MagicMock())
+        StatsSnapshot.objects.update(computed_at=timezone.now() - timedelta(hours=1))
+        self.add_student("ada")
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertTrue(response.data["is_stale"])
+        self.assertEqual(response.data["students"]["total"], 0)
+
+    def test_fresh_recomputes(self):
+        call_command("refresh_admin_stats", stdout=mock.MagicMock())
+        self.add_student("ada")
+
+        response = self.client.get(self.url, {"fresh": "true"})
+
+        self.assertEqual(response.data["students"], {"total": 1, "pending_applications": 1, "approved": 0})
+        self.assertEqual(StatsSnapshot.objects.get().data["students"]["total"], 1)
+
+    def test_first_request_computes_a_snapshot(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["courses"]["total"], 1)
+        self.assertTrue(StatsSnapshot.objects.exists())
+
+
+@SHARED_CACHE_THROTTLES
+class EventCalendarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = CourseCategory.objects.create(name="Data & AI")
+        cls.course = Course.objects.create(name="Python", category=category, description="", software_tools="")
+        cls.event = Event.objects.create(
+            title="Demo day", description="", date=cls.at(2026, 3, 15), course=cls.course
+        )
+        cls.students = [
+            create_student(User.objects.create_user(username=name, email=f"{name}@example.com", password="x"))
+            for name in ("ada", "grace")
+        ]
+
+    @staticmethod
+    def at(year, month, day):
+        return timezone.make_aware(datetime(year, month, day, 12))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def calendar(self, year=2026, month=3):
+        response = self.client.get(reverse("courses:event-calendar"), {"year": year, "month": month})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_attendee_counts_are_annotated(self):
+        Event.objects.create(title="Meetup", description="", date=self.at(2026, 3, 20))
+        for student in self.students:
+            EventAttendance.objects.create(event=self.event, student=student)
+
+        # events with their course, category, location and attendee count
+        with self.assertNumQueries(1):
+            data = self.calendar()
+
+        counts = {event["title"]: event["attendee_count"] for event in data["events"]}
+        self.assertEqual(counts, {"Demo day": 2, "Meetup": 0})
+
+    def test_month_is_cached_until_an_attendance_changes(self):
+        self.calendar()
+        with self.assertNumQueries(0):
+            self.calendar()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            EventAttendance.objects.create(event=self.event, student=self.students[0])
+
+        self.assertEqual(self.calendar()["events"][0]["attendee_count"], 1)
+
+    def test_rescheduling_invalidates_both_months(self):
+        self.calendar(month=3)
+        self.calendar(month=4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.date = self.at(2026, 4, 2)
+            self.event.save()
+
+        self.assertEqual(self.calendar(month=3)["count"], 0)
+        self.assertEqual(self.calendar(month=4)["count"], 1)
+
+    def test_catalog_changes_invalidate(self):
+        self.calendar()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.name = "Python 101"
+            self.course.save()
+
+        self.assertEqual(self.calendar()["events"][0]["course"], "Python 101")
+
+    def test_naive_dates_do_not_break_saving(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.date = datetime(2026, 5, 10, 12)
+            self.event.save()
+
+        self.assertEqual(self.calendar(month=5)["count"], 1)
+
+
+class StudentEnrollmentSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = CourseCategory.objects.create(name="Data & AI")
+        cls.courses = [
+            Course.objects.create(name=f"Course {i}", category=category, description="", software_tools="")
+            for i in range(3)
+        ]
+        cls.user = User.objects.create_user(username="ada", email="ada@example.com", password="x")
+
+    def enrollments(self, student):
+        return dict(CourseEnrollment.objects.filter(student=student).values_list("course_id", "status"))
+
+    def test_create_enrolls_selected_courses(self):
+        serializer = student_write_serializer(
+            self.user, data=student_fields(email=self.user.email, courses=[c.pk for c in self.courses[:2]])
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        student = serializer.save()
+
+        self.assertEqual(self.enrollments(student), {self.courses[0].pk: "Pending", self.courses[1].pk: "Pending"})
+
+    def test_update_adds_new_and_drops_unselected_pending_enrollments(self):
+        student = create_student(self.user)
+        student.courses.set(self.courses[:2])
+        CourseEnrollment.objects.create(student=student, course=self.courses[0], status="Approved")
+        CourseEnrollment.objects.create(student=student, course=self.courses[1], status="Pending")
+
+        serializer = student_write_serializer(
+            self.user, instance=student, data={"courses": [self.courses[2].pk]}, partial=True
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        # The reviewed enrollment stays as a record, the pending one is dropped
+        self.assertEqual(self.enrollments(student), {self.courses[0].pk: "Approved", self.courses[2].pk: "Pending"})
+        self.assertEqual(list(student.courses.all()), [self.courses[2]])
+
+    def test_resubmitting_the_same_courses_changes_nothing(self):
+        student = create_student(self.user)
+        CourseEnrollment.objects.create(student=student, course=self.courses[0], status="Under Review")
+
+        serializer = student_write_serializer(
+            self.user, instance=student, data={"courses": [self.courses[0].pk]}, partial=True
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        self.assertEqual(self.enrollments(student), {self.courses[0].pk: "Under Review"})
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    EMAIL_OUTBOX_ENABLED=True,
+    EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+)
+class OutboundEmailQueueTests(TestCase):
+    def setUp(self):
+        # Anonymous throttle counters are kept in the cache between tests
+        cache.clear()
+
+    def queue(self, subject="Hello"):
+        return queue_email(mail.EmailMessage(subject=subject, body="Body", to=["ada@example.com"]))
+
+    def test_queueing_does_not_send(self):
+        self.queue()
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.filter(status="queued").count(), 1)
+
+    def test_worker_delivers_batch(self):
+        self.queue("One")
+        self.queue("Two")
+
+        self.assertEqual(deliver_queued_emails(), (2, 0, 0))
+        self.assertEqual(sorted(m.subject for m in mail.outbox), ["One", "Two"])
+        self.assertFalse(OutboundEmail.objects.exclude(status="sent").exists())
+
+    def test_failures_are_retried_then_dead_lettered(self):
+        email = self.queue()
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=ConnectionError("mail host down"),
+        ):
+            self.assertEqual(deliver_queued_emails(), (0, 1, 0))
+            email.refresh_from_db()
+            self.assertEqual(email.status, "queued")
+            self.assertGreater(email.next_attempt_at, email.created_at)
+
+            OutboundEmail.objects.update(next_attempt_at=email.created_at)
+            self.assertEqual(deliver_queued_emails(), (0, 0, 1))
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, "failed")
+        self.assertIn("mail host down", email.last_error)
+
+    def test_claim_is_stored_before_sending(self):
+        email = self.queue()
+        statuses = []
+
+        def send_messages(backend, messages):
+            statuses.append(OutboundEmail.objects.get(pk=email.pk).status)
+            return len(messages)
+
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages", autospec=True, side_effect=send_messages
+        ):
+            self.assertEqual(deliver_queued_emails(), (1, 0, 0))
+        self.assertEqual(statuses, ["sending"])
+
+    def test_crashed_worker_only_leaves_unrecorded_emails(self):
+        self.queue("One")
+        self.queue("Two")
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=[1, SystemExit]
+        ):
+            with self.assertRaises(SystemExit):
+                deliver_queued_emails()
+
+        self.assertEqual(
+            dict(OutboundEmail.objects.values_list("subject", "status")), {"One": "sent", "Two": "sending"}
+        )
+        # Left alone while the claim lasts, then picked up again
+        self.assertEqual(deliver_queued_emails(), (0, 0, 0))
+        OutboundEmail.objects.filter(status="sending").update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_queued_emails(), (1, 0, 0))
+        self.assertEqual([message.subject for message in mail.outbox], ["Two"])
+
+    @override_settings(EMAIL_OUTBOX_RETENTION_DAYS=30)
+    def test_sweep_removes_old_sent_and_failed_emails(self):
+        old = timezone.now() - timedelta(days=31)
+        for subject, status in [("Old sent", "sent"), ("Old failed", "failed"), ("Old queued", "queued")]:
+            OutboundEmail.objects.filter(pk=self.queue(subject).pk).update(status=status, sent_at=old)
+        OutboundEmail.objects.update(created_at=old)
+        OutboundEmail.objects.filter(pk=self.queue("Recent").pk).update(status="sent", sent_at=timezone.now())
+
+        call_command("sweep_outbound_email", stdout=mock.MagicMock())
+
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list("subject", flat=True)), ["Old queued", "Recent"]
+        )
+
+    def test_send_batch_reports_each_message(self):
+        messages = [
+            mail.EmailMessage(subject="Sent", body="Body", to=["ada@example.com"]),
+            mail.EmailMessage(subject="Rejected", body="Body", to=["bob@example.com"]),
+        ]
+
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=[1, ConnectionError("rejected")],
+        ):
+            results = send_batch(messages)
+
+        self.assertEqual([result.sent for result in results], [True, False])
+        self.assertIsInstance(results[1].error, ConnectionError)
+
+    @override_settings(EMAIL_OUTBOX_ENABLED=False)
+    def test_contact_notifications_share_one_connection(self):
+        with mock.patch("courses.mail.get_connection", wraps=mail.get_connection) as get_connection:
+            response = APIClient().post(
+                reverse("courses:contact-us"),
+                {"name": "Ada", "email": "ada@example.com", "message": "Hello"},
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 2)
+
+
+class RegisterNumberAllocationTests(TestCase):
+    def test_numbers_are_consecutive_per_year(self):
+        self.assertEqual(allocate_register_numbers(year=2024), ["EVOLV-2024-0001"])
+        self.assertEqual(
+            allocate_register_numbers(2, year=2024), ["EVOLV-2024-0002", "EVOLV-2024-0003"]
+        )
+        self.assertEqual(allocate_register_numbers(year=2025), ["EVOLV-2025-0001"])
+
+    def test_continues_from_existing_sequence(self):
+        RegisterNumberSequence.objects.create(year=2024, last_value=41)
+
+        self.assertEqual(allocate_register_numbers(year=2024), ["EVOLV-2024-0042"])
+
+    def submit_application(self, username, **fields):
+        user = User.objects.create_user(username=username, email=f"{username}@example.com", password="x")
+        serializer = student_write_serializer(user, data=student_fields(email=user.email, **fields))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def test_new_students_get_the_next_number(self):
+        year = timezone.now().year
+        RegisterNumberSequence.objects.create(year=year, last_value=6)
+
+        first = self.submit_application("ada")
+        second = self.submit_application("grace")
+
+        self.assertEqual(first.register_number, f"EVOLV-{year}-0007")
+        self.assertEqual(second.register_number, f"EVOLV-{year}-0008")
+
+    def test_given_register_number_is_kept(self):
+        student = self.submit_application("ada", register_number="LEGACY-17")
+
+        self.assertEqual(student.register_number, "LEGACY-17")
+        self.assertFalse(RegisterNumberSequence.objects.exists())
+
+
+class EmailVerificationTokenTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="ada", email="ada@example.com", password="x")
+        self.url = reverse("courses:verify-email")
+
+    def test_only_hash_is_stored(self):
+        token = EmailVerificationToken.issue(self.user)
+
+        stored = EmailVerificationToken.objects.get(user=self.user)
+        self.assertNotEqual(stored.token_hash, token)
+        self.assertEqual(EmailVerificationToken.lookup(token), stored)
+
+    def test_reissuing_replaces_previous_token(self):
+        first = EmailVerificationToken.issue(self.user)
+        EmailVerificationToken.issue(self.user)
+
+        self.assertIsNone(EmailVerificationToken.lookup(first))
+        self.assertEqual(self.user.email_verification_tokens.count(), 1)
+
+    def test_verify_consumes_token(self):
+        token = EmailVerificationToken.issue(self.user)
+
+        response = APIClient().get(self.url, {"token": token})
+
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_email_verified)
+        self.assertFalse(EmailVerificationToken.objects.exists())
+
+    def test_expired_token_is_rejected(self):
+        token = EmailVerificationToken.issue(self.user)
+        EmailVerificationToken.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        response = APIClient().get(self.url, {"token": token})
+
+        self.assertEqual(response.status_code, 400)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_email_verified)
+
+    @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend", EMAIL_OUTBOX_ENABLED=True)
+    def test_sent_link_is_not_kept_in_the_outbox(self):
+        token = send_verification_email(self.user)
+        queued = OutboundEmail.objects.get()
+        self.assertTrue(queued.sensitive)
+
+        self.assertEqual(deliver_queued_emails(), (1, 0, 0))
+
+        self.assertIn(token, mail.outbox[0].body)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.body), ("sent", ""))
+
+
+@SHARED_CACHE_THROTTLES
+class FixedWindowThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def post_contact(self, client, i=0):
+        return client.post(
+            reverse("courses:contact-us"), {"name": "Ada", "email": f"ada{i}@example.com", "message": "Hello"}
+        )
+
+    def test_counts_in_shared_cache_and_reports_retry_after(self):
+        client = APIClient()
+        for i in range(3):
+            self.post_contact(client, i)
+
+        response = self.post_contact(client)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertLessEqual(int(response["Retry-After"]), 3600)
+        self.assertFalse(ThrottleCounter.objects.exists())
+        self.assertEqual(get_throttle_metrics(["contact"]), {"contact": {"allowed": 3, "throttled": 1}})
+
+    def test_counting_runs_no_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(APIClient().get(reverse("courses:health-check")).status_code, 200)
+        self.assertEqual(get_throttle_metrics(["anon"])["anon"]["allowed"], 1)
+
+    def test_default_store_follows_the_throttle_cache(self):
+        def default_store(**env):
+            with mock.patch.dict(os.environ, env):
+                for name in {"REDIS_URL", "THROTTLE_STORE", "CACHE_BACKEND"} - set(env):
+                    os.environ.pop(name, None)
+                return runpy.run_module("evolv_backend.settings")["THROTTLE_STORE"]
+
+        # Locmem and file caches would count per gunicorn worker
+        self.assertEqual(default_store(), "courses.throttles.DatabaseThrottleStore")
+        self.assertEqual(
+            default_store(CACHE_BACKEND="django.core.cache.backends.filebased.FileBasedCache"),
+            "courses.throttles.DatabaseThrottleStore",
+        )
+        self.assertEqual(default_store(REDIS_URL="redis://localhost:6379/1"), "courses.throttles.CacheThrottleStore")
+
+    @override_settings(THROTTLE_STORE="courses.throttles.DatabaseThrottleStore")
+    def test_database_store(self):
+        client = APIClient()
+        for i in range(4):
+            response = self.post_contact(client, i)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(ThrottleCounter.objects.get(key="throttle_contact_127.0.0.1").count, 4)
+        self.assertEqual(get_throttle_metrics(["contact"]), {"contact": {"allowed": 3, "throttled": 1}})
+
+        # Metric totals outlive the sweep of expired windows
+        ThrottleCounter.objects.filter(key="throttle_contact_127.0.0.1").update(expires_at=timezone.now())
+        call_command("sweep_throttle_counters", stdout=mock.MagicMock())
+        self.assertFalse(ThrottleCounter.objects.filter(key="throttle_contact_127.0.0.1").exists())
+        self.assertEqual(get_throttle_metrics(["contact"]), {"contact": {"allowed": 3, "throttled": 1}})
+
+    def test_scopes_are_counted_separately(self):
+        client = APIClient()
+        for _ in range(5):
+            client.get(reverse("courses:health-check"))
+
+        self.assertEqual(self.post_contact(client).status_code, 201)
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="x")
+        category = CourseCategory.objects.create(name="Data & AI")
+        course = Course.objects.create(name="Course", category=category, description="", software_tools="")
+        for i in range(25):
+            user = User.objects.create_user(username=f"student{i:02d}", email=f"student{i}@example.com", password="x")
+            Profile.objects.create(user=user, role="Student")
+            CourseEnrollment.objects.create(student=create_student(user), course=course)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_cursor_pages_cover_every_row_once(self):
+        for name in ["courses:enrollment-list", "courses:student-list", "courses:admin-profile-list"]:
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name), {"cursor": ""})
+                self.assertNotIn("count", response.data)
+                ids = [row["id"] for row in response.data["results"]]
+                while response.data["next"]:
+                    response = self.client.get(response.data["next"])
+                    ids += [row["id"] for row in response.data["results"]]
+
+                self.assertEqual(len(ids), 25)
+                self.assertEqual(len(set(ids)), 25)
+
+    def test_cursor_pages_skip_count_and_offset(self):
+        url = reverse("courses:admin-profile-list")
+        response = self.client.get(url, {"cursor": ""})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(response.data["next"])
+
+        sql = " ".join(query["sql"] for query in queries.captured_queries)
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_page_numbers_stay_the_default(self):
+        response = self.client.get(reverse("courses:enrollment-list"))
+
+        self.assertEqual(response.data["count"], 25)
+        self.assertEqual(len(response.data["results"]), 20)
+
+    def test_optional_count(self):
+        response = self.client.get(reverse("courses:enrollment-list"), {"cursor": "", "count": "approximate"})
+
+        self.assertEqual(response.data["count"], 25)
+
+
+@SHARED_CACHE_THROTTLES
+class AdminEnrollmentListTests(TestCase):
+    # count + enrollments joined with student and course
+    QUERY_BUDGET = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="x")
+        cls.category = CourseCategory.objects.create(name="Data & AI")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse("courses:enrollment-list")
+
+    def add_enrollments(self, count):
+        start = CourseEnrollment.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(username=f"student{i}", email=f"student{i}@example.com", password="x")
+            course = Course.objects.create(name=f"Course {i}", category=self.category, description="", software_tools="")
+            CourseEnrollment.objects.create(student=create_student(user), course=course)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.add_enrollments(1)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            self.client.get(self.url)
+
+        self.add_enrollments(10)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data["results"]), 11)
+        enrollment = response.data["results"][0]
+        self.assertEqual(enrollment["course"]["category"], "Data & AI")
+        self.assertEqual(enrollment["student"]["first_name"], "Ada")
+        self.assertNotIn("enrollments", enrollment["student"])
+
+    def test_sparse_fields(self):
+        self.add_enrollments(2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"fields": "id,status,course"})
+
+        self.assertEqual(set(response.data["results"][0]), {"id", "status", "course"})
+        self.assertNotIn("courses_student", queries.captured_queries[-1]["sql"])
+
+
+class DynamicFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="x")
+        cls.category = CourseCategory.objects.create(name="Data & AI")
+        cls.location = Location.objects.create(name="Malta", location_type="Campus", country="Malta")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def add_students(self, count):
+        start = Student.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(username=f"student{i}", email=f"student{i}@example.com", password="x")
+            course = Course.objects.create(name=f"Course {i}", category=self.category, description="", software_tools="")
+            course.locations.add(self.location)
+            student = create_student(user)
+            student.courses.add(course)
+            CourseEnrollment.objects.create(student=student, course=course)
+
+    def test_fields_limits_output_and_columns(self):
+        self.add_students(2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("courses:student-list"), {"fields": "id,first_name"})
+
+        first = Student.objects.order_by("id").first()
+        self.assertEqual(response.data["results"][0], {"id": first.pk, "first_name": first.first_name})
+        self.assertNotIn("motivation", queries.captured_queries[-1]["sql"])
+
+    def test_expand_renders_nested_objects(self):
+        self.add_students(1)
+
+        response = self.client.get(reverse("courses:course-list"), {"expand": "locations"})
+        self.assertEqual(response.data["results"][0]["locations"][0]["name"], "Malta")
+
+        response = self.client.get(reverse("courses:course-list"))
+        self.assertEqual(response.data["results"][0]["locations"], ["Malta (Campus)"])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        url = reverse("courses:student-list")
+        self.add_students(1)
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(url, {"expand": "courses"})
+
+        self.add_students(5)
+        with self.assertNumQueries(len(first)):
+            response = self.client.get(url, {"expand": "courses"})
+
+        self.assertEqual(response.data["results"][5]["courses"][0]["category"], "Data & AI")
+
+
+@SHARED_CACHE_THROTTLES
+class CurriculumTests(TestCase):
+    # schedule with course + modules + lessons
+    QUERY_BUDGET = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CourseCategory.objects.create(name="Data & AI")
+        location = Location.objects.create(name="Malta", location_type="Campus", country="Malta")
+        course = Course.objects.create(name="Python", category=category, description="", software_tools="")
+        cls.schedule = LearningSchedule.objects.create(
+            course=course,
+            location=location,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=90),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse("courses:schedule-curriculum", args=[self.schedule.pk])
+
+    def add_modules(self, count, lessons=3):
+        start = self.schedule.modules.count()
+        for i in range(start, start + count):
+            module = Module.objects.create(schedule=self.schedule, title=f"Module {i}", order=i)
+            for j in range(lessons):
+                Lesson.objects.create(module=module, title=f"Lesson {i}.{j}", content="Body", order=j)
+
+    def test_query_count_does_not_grow_with_modules(self):
+        self.add_modules(1)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            self.client.get(self.url)
+
+        cache.clear()
+        self.add_modules(5)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.data["modules_count"], 6)
+        self.assertEqual(response.data["lessons_count"], 18)
+        self.assertEqual(response.data["modules"][5]["lessons_count"], 3)
+        self.assertEqual(response.data["modules"][5]["lessons"][0]["title"], "Lesson 5.0")
+
+    def test_cached_until_a_lesson_changes(self):
+        self.add_modules(1)
+        first = self.client.get(self.url)
+
+        # Nothing is left to query once the tree is cached
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        lesson = Lesson.objects.first()
+        lesson.title = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["modules"][0]["lessons"][0]["title"], "Renamed")
+
+    def test_missing_schedule(self):
+        response = self.client.get(reverse("courses:schedule-curriculum", args=[self.schedule.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_module_list_prefetches_lessons(self):
+        url = reverse("courses:module-list")
+        self.add_modules(1)
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(url)
+
+        self.add_modules(5)
+        with self.assertNumQueries(len(first)):
+            response = self.client.get(url)
+        self.assertEqual(response.data["results"][5]["lessons_count"], 3)
+
+
+class LessonContentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = CourseCategory.objects.create(name="Data & AI")
+        location = Location.objects.create(name="Malta", location_type="Campus", country="Malta")
+        course = Course.objects.create(name="Python", category=category, description="", software_tools="")
+        schedule = LearningSchedule.objects.create(
+            course=course,
+            location=location,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=90),
+        )
+        module = Module.objects.create(schedule=schedule, title="Basics", order=1)
+        cls.lesson = Lesson.objects.create(module=module, title="Loops", content="For and while loops", order=1)
+        Lesson.objects.create(module=module, title="Functions", content="def and return", order=2)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_list_leaves_out_content(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("courses:lesson-list"))
+
+        self.assertNotIn("content", response.data["results"][0])
+        self.assertNotIn('"content"', queries.captured_queries[-1]["sql"])
+
+    def test_content_filter(self):
+        response = self.client.get(reverse("courses:lesson-list"), {"content__icontains": "WHILE"})
+        self.assertEqual([lesson["title"] for lesson in response.data["results"]], ["Loops"])
+
+        response = self.client.get(reverse("courses:lesson-list"), {"search": "while"})
+        self.assertEqual(response.data["results"], [])
+
+    def test_detail_includes_content(self):
+        response = self.client.get(reverse("courses:lesson-detail", args=[self.lesson.pk]))
+        self.assertEqual(response.data["content"], "For and while loops")
+
+    def test_content_endpoint_revalidates_with_etag(self):
+        url = reverse("courses:lesson-content", args=[self.lesson.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.data, {"id": self.lesson.pk, "content": "For and while loops"})
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+        etag = response["ETag"]
+        Lesson.objects.filter(pk=self.lesson.pk).update(content="Updated")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["content"], "Updated")
+
+        response = self.client.get(reverse("courses:lesson-content", args=[self.lesson.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+
+class FullTextSearchFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = CourseCategory.objects.create(name="Data & AI")
+        Course.objects.create(name="Python", category=category, description="Scripting", software_tools="VS Code")
+        Course.objects.create(name="Data Science", category=category, description="Pandas", software_tools="Python")
+        Course.objects.create(name="Design", category=category, description="Figma", software_tools="Figma")
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, term):
+        response = APIClient().get(reverse("courses:course-list"), {"search": term})
+        return [course["name"] for course in response.data["results"]]
+
+    def test_matches_any_searched_column(self):
+        self.assertCountEqual(self.search("python"), ["Data Science", "Python"])
+
+    @skipIf(connection.vendor == "postgresql", "PostgreSQL searches the stored vectors")
+    def test_falls_back_to_search_fields_without_postgres(self):
+        self.assertEqual(self.search("python"), ["Data Science", "Python"])
+        self.assertIsNone(Course.objects.first().search_vector)
+
+    @skipUnless(connection.vendor == "postgresql", "search vectors are only stored on PostgreSQL")
+    def test_name_matches_rank_first(self):
+        self.assertEqual(self.search("python"), ["Python", "Data Science"])
+
+    @skipUnless(connection.vendor == "postgresql", "search vectors are only stored on PostgreSQL")
+    def test_vector_is_refreshed_on_save(self):
+        course = Course.objects.get(name="Design")
+        self.assertIsNotNone(course.search_vector)
+        self.assertEqual(self.search("sketching"), [])
+
+        course.description = "Sketching with Python"
+        course.save()
+
+        self.assertEqual(self.search("sketching"), ["Design"])
+        self.assertEqual(self.search("python")[0], "Python")
+        self.assertIn("Design", self.search("python"))
+
+
+class ChunkedUploadTests(TestCase):
+    CONTENT = b"%PDF-1.7\n" + b"x" * 2500
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="x")
+        category = CourseCategory.objects.create(name="Data & AI")
+        cls.course = Course.objects.create(name="Python", category=category, description="", software_tools="")
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        staging_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.addCleanup(shutil.rmtree, staging_dir)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root, UPLOAD_STAGING_DIR=staging_dir, UPLOAD_CHUNK_SIZE=1024
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(
+            reverse("courses:material-upload-list"),
+            {"course": self.course.pk, "title": "Slides", "filename": "slides", "size": len(self.CONTENT)},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["chunk_size"], 1024)
+        self.url = reverse("courses:material-upload-detail", args=[response.data["id"]])
+        self.finalize_url = reverse("courses:material-upload-finalize", args=[response.data["id"]])
+
+    def put_chunk(self, offset, data):
+        return self.client.put(
+            self.url, data, content_type="application/octet-stream", HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def test_upload_in_chunks_and_finalize(self):
+        for offset in range(0, len(self.CONTENT), 1024):
+            response = self.put_chunk(offset, self.CONTENT[offset:offset + 1024])
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Upload-Offset"], str(len(self.CONTENT)))
+
+        response = self.client.post(self.finalize_url)
+        self.assertEqual(response.status_code, 201)
+
+        material = CourseMaterial.objects.get(pk=response.data["id"])
+        # No extension, so the type comes from the PDF signature
+        self.assertEqual(material.material_type, "document")
+        self.assertEqual(material.file_size, len(self.CONTENT))
+        self.assertEqual(material.content_hash, hashlib.sha256(self.CONTENT).hexdigest())
+        with material.file.open("rb") as stored:
+            self.assertEqual(stored.read(), self.CONTENT)
+
+        self.assertEqual(self.client.post(self.finalize_url).status_code, 409)
+
+    def test_resume_from_received_offset(self):
+        self.put_chunk(0, self.CONTENT[:1024])
+
+        # A retried or skipped chunk is rejected with the offset to resume from
+        response = self.put_chunk(2048, self.CONTENT[2048:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["received"], 1024)
+
+        self.assertEqual(self.client.get(self.url)["Upload-Offset"], "1024")
+        self.assertEqual(self.client.post(self.finalize_url).status_code, 409)
+
+        self.put_chunk(1024, self.CONTENT[1024:2048])
+        self.put_chunk(2048, self.CONTENT[2048:])
+        self.assertEqual(self.client.post(self.finalize_url).status_code, 201)
+
+    def test_rejects_oversized_chunks(self):
+        response = self.put_chunk(0, self.CONTENT[:2048])
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(UploadSession.objects.get().received, 0)
+
+    def test_chunk_streams_outside_a_transaction_under_a_lease(self):
+        depth = len(connection.savepoint_ids)
+        during_write = {}
+
+        def append(session, stream, length):
+            during_write["depth"] = len(connection.savepoint_ids)
+            during_write["lease"] = UploadSession.objects.get().writing_until
+            return append_chunk(session, stream, length)
+
+        with mock.patch("courses.views_extended.append_chunk", append):
+            response = self.put_chunk(0, self.CONTENT[:1024])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(during_write["depth"], depth)
+        self.assertIsNotNone(during_write["lease"])
+        session = UploadSession.objects.get()
+        self.assertEqual((session.received, session.writing_until), (1024, None))
+
+    def test_leased_upload_rejects_other_chunks(self):
+        UploadSession.objects.update(writing_until=timezone.now() + timedelta(minutes=5))
+        response = self.put_chunk(0, self.CONTENT[:1024])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(UploadSession.objects.get().received, 0)
+
+        # An expired lease belonged to a request that is gone
+        UploadSession.objects.update(writing_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.put_chunk(0, self.CONTENT[:1024]).status_code, 200)
+        self.assertEqual(UploadSession.objects.get().received, 1024)
+
+    def test_rejects_negative_content_length(self):
+        response = self.client.put(
+            self.url, b"", content_type="application/octet-stream", HTTP_UPLOAD_OFFSET="0", CONTENT_LENGTH="-1"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get().received, 0)
+
+    def test_staged_file_is_hashed_outside_the_row_lock(self):
+        for offset in range(0, len(self.CONTENT), 1024):
+            self.put_chunk(offset, self.CONTENT[offset:offset + 1024])
+
+        depths = {}
+
+        def record_depth(name, function):
+            def wrapper(*args, **kwargs):
+                depths[name] = len(connection.savepoint_ids)
+                return function(*args, **kwargs)
+            return wrapper
+
+        with mock.patch(
+            "courses.views_extended.inspect_staged_file", record_depth("inspect", inspect_staged_file)
+        ), mock.patch("courses.views_extended.finalize_upload", record_depth("finalize", finalize_upload)):
+            response = self.client.post(self.finalize_url)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertLess(depths["inspect"], depths["finalize"])
+        self.assertEqual(CourseMaterial.objects.get().content_hash, hashlib.sha256(self.CONTENT).hexdigest())
+
+
+class MaterialFileTestCase(TestCase):
+    CONTENT = b"0123456789" * 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="x")
+        cls.category = CourseCategory.objects.create(name="Data & AI")
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.course = Course.objects.create(name="Python", category=self.category, description="", software_tools="")
+        self.material = CourseMaterial(course=self.course, title="Intro")
+        self.material.file.save("intro.mp4", ContentFile(self.CONTENT))
+        self.url = reverse("courses:course-material-download", args=[self.material.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+
+class MaterialDownloadTests(MaterialFileTestCase):
+    def test_full_and_ranged_downloads(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(self.body(response), self.CONTENT)
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-14")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-14/100")
+        self.assertEqual(self.body(response), b"01234")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=95-")
+        self.assertEqual(response["Content-Length"], "5")
+        self.assertEqual(self.body(response), b"56789")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-3")
+        self.assertEqual(self.body(response), b"789")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */100")
+
+    def test_conditional_requests(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A stale If-Range gets the whole file instead of the range
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX="/protected-media/")
+    def test_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.material.file.name}")
+        self.assertEqual(response.content, b"")
+
+    def test_only_approved_students(self):
+        user = User.objects.create_user(username="student", email="student@example.com", password="x")
+        enrollment = CourseEnrollment.objects.create(student=create_student(user), course=self.course)
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        enrollment.status = "Approved"
+        enrollment.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+@override_settings(MEDIA_SIGNING_KEYS=[("new", "new-secret"), ("old", "old-secret")])
+@SHARED_CACHE_THROTTLES
+class SignedMediaUrlTests(MaterialFileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.name = self.material.file.name
+        self.signed_url = reverse("courses:signed-media", args=[self.name])
+
+    def test_signed_url_is_served_without_queries(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.signed_url, sign_media_name(self.name), HTTP_RANGE="bytes=90-")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), b"0123456789")
+
+    def test_rejects_tampered_expired_and_revoked_links(self):
+        params = sign_media_name(self.name)
+        other = reverse("courses:signed-media", args=["course_files/others/secret.pdf"])
+        self.assertEqual(self.client.get(other, params).status_code, 404)
+
+        self.assertEqual(self.client.get(self.signed_url, sign_media_name(self.name, lifetime=-3600)).status_code, 404)
+
+        with override_settings(MEDIA_SIGNING_KEYS=[("old", "old-secret")]):
+            old_params = sign_media_name(self.name)
+        self.assertEqual(self.client.get(self.signed_url, old_params).status_code, 200)
+        with override_settings(MEDIA_SIGNING_KEYS=[("new", "new-secret")]):
+            self.assertEqual(self.client.get(self.signed_url, old_params).status_code, 404)
+
+    def test_learning_materials_mint_signed_urls(self):
+        user = User.objects.create_user(username="student", email="student@example.com", password="x")
+        CourseEnrollment.objects.create(student=create_student(user), course=self.course, status="Approved")
+        self.client.force_authenticate(user)
+
+        response = self.client.get(reverse("courses:learning-materials"))
+        download_url = response.data["results"][0]["download_url"]
+        # No unsigned link is handed out next to it
+        self.assertEqual(response.data["results"][0]["file_url"], download_url)
+        self.assertIn("sig=", download_url)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.body(self.client.get(download_url)), self.CONTENT)
+
+
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = CourseCategory.objects.create(name="Data & AI")
+        cls.courses = [
+            Course.objects.create(name=f"Course {i}", category=category, description="", software_tools="")
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def add_material(self, course, content, filename="dataset.csv"):
+        material = CourseMaterial(course=course, title=filename)
+        material.file.save(filename, ContentFile(content))
+        return material
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.add_material(self.courses[0], b"a,b\n1,2\n")
+        second = self.add_material(self.courses[1], b"a,b\n1,2\n", filename="copy.csv")
+
+        content_hash = hashlib.sha256(b"a,b\n1,2\n").hexdigest()
+        self.assertEqual(first.file.name, f"blobs/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.csv")
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertEqual(first.content_hash, content_hash)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+
+        second.delete()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_gc_removes_only_unreferenced_blobs(self):
+        kept = self.add_material(self.courses[0], b"kept")
+        dropped = self.add_material(self.courses[0], b"dropped")
+        dropped_name = dropped.file.name
+        dropped.delete()
+
+        # Within the grace period nothing is collected
+        call_command("gc_blobs", stdout=mock.MagicMock())
+        self.assertTrue(default_storage.exists(dropped_name))
+
+        StoredBlob.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("gc_blobs", stdout=mock.MagicMock())
+
+        self.assertFalse(default_storage.exists(dropped_name))
+        self.assertTrue(default_storage.exists(kept.file.name))
+        self.assertEqual(list(StoredBlob.objects.values_list("name", flat=True)), [kept.file.name])
+
+    def test_upload_after_gc_stores_the_blob_again(self):
+        dropped = self.add_material(self.courses[0], b"a,b\n1,2\n")
+        name = dropped.file.name
+        dropped.delete()
+        StoredBlob.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        call_command("gc_blobs", stdout=mock.MagicMock())
+        self.assertFalse(default_storage.exists(name))
+
+        material = self.add_material(self.courses[1], b"a,b\n1,2\n")
+
+        self.assertEqual(material.file.name, name)
+        with material.file.open("rb") as stored:
+            self.assertEqual(stored.read(), b"a,b\n1,2\n")
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 1)
+
+    def test_existing_file_is_reused_under_its_canonical_name(self):
+        # What a concurrent first upload of the same content leaves behind
+        content_hash = hashlib.sha256(b"a,b\n1,2\n").hexdigest()
+        name = default_storage.save(
+            f"blobs/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.csv", ContentFile(b"a,b\n1,2\n")
+        )
+
+        material = self.add_material(self.courses[0], b"a,b\n1,2\n")
+
+        self.assertEqual(material.file.name, name)
+        self.assertEqual(default_storage.listdir(os.path.dirname(name))[1], [os.path.basename(name)])
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_deleting_a_shared_file_keeps_the_blob(self):
+        first = self.add_material(self.courses[0], b"shared")
+        second = self.add_material(self.courses[1], b"shared", filename="copy.csv")
+
+        first.file.delete()
+
+        self.assertTrue(default_storage.exists(second.file.name))
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+
+def png_bytes(size=(1000, 500), mode="RGBA"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=[320, 640, 1280], IMAGE_VARIANT_FORMATS=["webp", "jpeg"])
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+
+    def add_event(self, title="Demo day", content=None):
+        event = Event(title=title, description="", date=timezone.now())
+        event.image.save(f"{title}.png", ContentFile(content or png_bytes()))
+        return event
+
+    def process(self):
+        call_command("process_image_variants", stdout=mock.MagicMock())
+
+    def test_saving_an_image_queues_it_once(self):
+        event = self.add_event()
+        event.save()
+        self.assertEqual(list(ImageVariants.objects.values_list("source", "status")), [(event.image.name, "pending")])
+
+    def test_worker_renders_widths_narrower_than_the_original(self):
+        event = self.add_event()
+        self.process()
+
+        row = ImageVariants.objects.get(source=event.image.name)
+        self.assertEqual(row.status, "ready")
+        self.assertEqual(set(row.variants), {"webp", "jpeg"})
+        self.assertEqual(set(row.variants["webp"]), {"320", "640"})
+
+        with default_storage.open(row.variants["jpeg"]["320"]) as stored, Image.open(stored) as image:
+            self.assertEqual((image.format, image.mode, image.size), ("JPEG", "RGB", (320, 160)))
+        with default_storage.open(row.variants["webp"]["640"]) as stored, Image.open(stored) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (640, 320)))
+
+    def test_claimed_images_are_rendered_outside_a_transaction(self):
+        event = self.add_event()
+        depth = len(connection.savepoint_ids)
+        during_render = {}
+
+        def render(source):
+            during_render["depth"] = len(connection.savepoint_ids)
+            during_render["status"] = ImageVariants.objects.get(source=source).status
+            return build_variants(source)
+
+        class InlineExecutor:
+            # Renders on this thread, so it sees this test's connection
+            def __init__(self, max_workers):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            map = staticmethod(map)
+
+        with mock.patch("courses.images.build_variants", render), mock.patch(
+            "courses.images.ThreadPoolExecutor", InlineExecutor
+        ):
+            self.process()
+
+        self.assertEqual(during_render, {"depth": depth, "status": "processing"})
+        row = ImageVariants.objects.get(source=event.image.name)
+        self.assertEqual((row.status, row.claimed_until), ("ready", None))
+
+    def test_expired_claims_are_picked_up_again(self):
+        event = self.add_event()
+        ImageVariants.objects.update(status="processing", claimed_until=timezone.now() + timedelta(minutes=5))
+        self.process()
+        self.assertEqual(ImageVariants.objects.get().status, "processing")
+
+        # The worker holding the claim died
+        ImageVariants.objects.update(claimed_until=timezone.now() - timedelta(seconds=1))
+        self.process()
+        self.assertEqual(ImageVariants.objects.get(source=event.image.name).status, "ready")
+
+    def test_unreadable_images_are_marked_failed(self):
+        event = self.add_event(content=b"not an image")
+        self.process()
+        row = ImageVariants.objects.get(source=event.image.name)
+        self.assertEqual(row.status, "failed")
+        self.assertIn("UnidentifiedImageError", row.error)
+
+    def test_event_list_exposes_srcsets_once_ready(self):
+        self.add_event()
+        response = self.client.get(reverse("courses:event-list"))
+        self.assertIsNone(response.data["results"][0]["image_variants"])
+
+        self.process()
+        srcsets = self.client.get(reverse("courses:event-list")).data["results"][0]["image_variants"]
+        self.assertRegex(srcsets["webp"], r"^http://testserver/media/variants/.+/320w\.webp 320w, .+/640w\.webp 640w$")
+        self.assertIn("320w.jpg 320w", srcsets["jpeg"])
+
+    def test_variants_of_a_list_are_loaded_in_one_query(self):
+        def list_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse("courses:event-list")).status_code, 200)
+            return len(queries)
+
+        self.add_event("First")
+        self.process()
+        single = list_queries()
+
+        self.add_event("Second")
+        self.add_event("Third")
+        self.process()
+        self.assertEqual(list_queries(), single)
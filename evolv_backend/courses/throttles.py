@@ -1,24 +1,187 @@
 """
 Custom throttling classes for rate limiting
+
+DRF's SimpleRateThrottle keeps a list of request timestamps per client in
+the default cache. These throttles count requests in fixed windows
+instead, which needs one counter per client, and keep the counters in a
+store shared by every worker (THROTTLE_STORE).
+
+With REDIS_URL set the store is the "throttle" cache alias, so counting a
+request costs no database query. Without a cache shared by the workers the
+default is DatabaseThrottleStore, which costs two upserts per throttle
+scope per request: the window counter and the allowed/throttled total.
+Those totals are kept in the same store as the counters, so with either
+store they cover every worker.
 """
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.utils.module_loading import import_string
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 
 
-class RegisterRateThrottle(AnonRateThrottle):
+# Metric totals never expire; sweep_throttle_counters leaves them alone
+METRICS_WINDOW_START = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+METRICS_EXPIRES_AT = datetime(9999, 12, 31, tzinfo=dt_timezone.utc)
+
+
+class DatabaseThrottleStore:
+    """
+    Counters in the ThrottleCounter table, one row per client and scope,
+    and one row per metric total. Every counted request runs two upserts.
+    """
+
+    def hit(self, key, window_start, duration):
+        """Count a request in the window and return the window's count"""
+        start = datetime.fromtimestamp(window_start, tz=dt_timezone.utc)
+        return self._upsert(key, start, start + timedelta(seconds=duration))
+
+    def incr(self, key):
+        return self._upsert(key, METRICS_WINDOW_START, METRICS_EXPIRES_AT)
+
+    def get_many(self, keys):
+        from .models import ThrottleCounter
+
+        return dict(ThrottleCounter.objects.filter(key__in=keys).values_list("key", "count"))
+
+    def _upsert(self, key, start, end):
+        from .models import ThrottleCounter
+
+        table = connection.ops.quote_name(ThrottleCounter._meta.db_table)
+
+        # A single upsert, so concurrent workers never lose a count and no
+        # row lock is held between statements. The counter restarts when
+        # the stored window is an older one.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} ("key", "window_start", "expires_at", "count")
+                VALUES (%s, %s, %s, 1)
+                ON CONFLICT ("key") DO UPDATE SET
+                    "count" = CASE WHEN {table}."window_start" = EXCLUDED."window_start"
+                                   THEN {table}."count" + 1 ELSE 1 END,
+                    "window_start" = EXCLUDED."window_start",
+                    "expires_at" = EXCLUDED."expires_at"
+                RETURNING "count"
+                """,
+                [key, start, end],
+            )
+            return cursor.fetchone()[0]
+
+
+class CacheThrottleStore:
+    """
+    Counters in a cache alias (THROTTLE_CACHE_ALIAS, by default "throttle",
+    which is Redis when REDIS_URL is set)
+    """
+
+    def __init__(self):
+        self.cache = caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def hit(self, key, window_start, duration):
+        window_key = f"{key}:{window_start}"
+        self.cache.add(window_key, 0, timeout=duration)
+        try:
+            return self.cache.incr(window_key)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.set(window_key, 1, timeout=duration)
+            return 1
+
+    def incr(self, key):
+        self.cache.add(key, 0, timeout=None)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, 1, timeout=None)
+            return 1
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+
+def get_throttle_store():
+    return import_string(settings.THROTTLE_STORE)()
+
+
+def _metrics_key(scope, outcome):
+    return f"throttle-metrics:{scope}:{outcome}"
+
+
+def record_throttle_metric(scope, allowed, store=None):
+    store = store or get_throttle_store()
+    store.incr(_metrics_key(scope, "allowed" if allowed else "throttled"))
+
+
+def get_throttle_metrics(scopes):
+    """Allowed and throttled request totals per scope"""
+    keys = {
+        (scope, outcome): _metrics_key(scope, outcome)
+        for scope in scopes
+        for outcome in ("allowed", "throttled")
+    }
+    values = get_throttle_store().get_many(list(keys.values()))
+    return {
+        scope: {outcome: values.get(keys[scope, outcome], 0) for outcome in ("allowed", "throttled")}
+        for scope in scopes
+    }
+
+
+class FixedWindowThrottleMixin:
+    """
+    Replaces the timestamp history of SimpleRateThrottle with a counter per
+    fixed window. Windows are aligned to the rate's duration, so Retry-After
+    is the exact time left until the current window ends.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window_start = int(self.now // self.duration * self.duration)
+        self.window_end = window_start + self.duration
+
+        store = get_throttle_store()
+        count = store.hit(self.key, window_start, self.duration)
+        allowed = count <= self.num_requests
+        record_throttle_metric(self.scope, allowed, store)
+        return allowed
+
+    def wait(self):
+        return max(0, math.ceil(self.window_end - self.now))
+
+
+class AnonFixedWindowThrottle(FixedWindowThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class UserFixedWindowThrottle(FixedWindowThrottleMixin, UserRateThrottle):
+    pass
+
+
+class RegisterRateThrottle(AnonFixedWindowThrottle):
     """Limit registration attempts"""
-    rate = '5/hour'
+    scope = 'register'
 
 
-class LoginRateThrottle(AnonRateThrottle):
+class LoginRateThrottle(AnonFixedWindowThrottle):
     """Limit login attempts"""
-    rate = '10/hour'
+    scope = 'login'
 
 
-class ContactUsRateThrottle(AnonRateThrottle):
+class ContactUsRateThrottle(AnonFixedWindowThrottle):
     """Limit contact form submissions"""
-    rate = '3/hour'
+    scope = 'contact'
 
 
-class StudentApplicationRateThrottle(UserRateThrottle):
+class StudentApplicationRateThrottle(UserFixedWindowThrottle):
     """Limit student application submissions"""
-    rate = '2/day'
+    scope = 'student_application'
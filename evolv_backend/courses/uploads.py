@@ -0,0 +1,116 @@
+"""
+Chunked, resumable course material uploads
+
+A client creates an UploadSession, PUTs the file in chunks at increasing
+offsets and finalizes it. Each chunk is streamed from the request straight
+into the session's staging file, so no chunk is ever held in memory or
+spooled twice. While a chunk streams, no transaction is open: the session
+carries a lease (writing_until) that keeps other chunks out, taken and
+released in short transactions around the write. A chunk that breaks off is discarded by truncating the
+staging file back to the last complete offset, which is what the client
+resumes from.
+
+Finalizing reads the staging file once to get its size, SHA-256 and leading
+bytes (for type detection), outside the session's row lock: once every byte
+has been received the staging file no longer changes. It then hands the file
+to the storage together with the hash. Content already stored is not written again; otherwise
+FileSystemStorage moves the staging file into place and other storages
+stream it.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+
+from .filetypes import SNIFF_SIZE, detect_material_type
+from .models import CourseMaterial
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class StagedFile(File):
+    """A staging file that FileSystemStorage can move instead of copying"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def _open_staging_file(session):
+    os.makedirs(os.path.dirname(session.staging_path), exist_ok=True)
+    fd = os.open(session.staging_path, os.O_RDWR | os.O_CREAT, 0o600)
+    return os.fdopen(fd, "r+b")
+
+
+def append_chunk(session, stream, length):
+    """
+    Write `length` bytes from `stream` at session.received. Returns False,
+    keeping nothing, if the stream ends early. The caller records the new
+    offset.
+    """
+    with _open_staging_file(session) as staging:
+        # Drop whatever an interrupted chunk left behind
+        staging.truncate(session.received)
+        staging.seek(session.received)
+
+        remaining = length
+        while remaining > 0:
+            block = stream.read(min(STREAM_BLOCK_SIZE, remaining))
+            if not block:
+                staging.truncate(session.received)
+                return False
+            staging.write(block)
+            remaining -= len(block)
+    return True
+
+
+def inspect_staged_file(path):
+    """Return (size, sha256 hex digest, leading bytes) of a file in one pass"""
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    with open(path, "rb") as staging:
+        while block := staging.read(STREAM_BLOCK_SIZE):
+            if len(head) < SNIFF_SIZE:
+                head += block[:SNIFF_SIZE - len(head)]
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest(), head
+
+
+def finalize_upload(session, staged=None):
+    """
+    Turn a fully received session into a CourseMaterial. `staged` is the
+    result of inspect_staged_file(), if the caller already has it.
+    """
+    size, content_hash, head = staged or inspect_staged_file(session.staging_path)
+
+    material = CourseMaterial(
+        course=session.course,
+        title=session.title,
+        description=session.description,
+        material_type=detect_material_type(head, session.filename),
+        file_size=size,
+        content_hash=content_hash,
+        uploaded_by=session.uploaded_by,
+    )
+    with open(session.staging_path, "rb") as staging:
+        staged = StagedFile(staging)
+        # Already hashed above; ContentAddressedStorage reuses it
+        staged.content_hash = content_hash
+        material.file.save(session.filename, staged, save=False)
+    material.save()
+
+    if os.path.exists(session.staging_path):
+        os.remove(session.staging_path)
+
+    session.status = "complete"
+    session.material = material
+    session.save(update_fields=["status", "material"])
+    return material
+
+
+def discard_staged_file(session):
+    try:
+        os.remove(session.staging_path)
+    except FileNotFoundError:
+        pass
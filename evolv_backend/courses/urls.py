@@ -48,10 +48,12 @@ from .views import (
     ReviewDetailView,
     LearningScheduleListCreateView,
     LearningScheduleDetailView,
+    LearningScheduleCurriculumView,
     ModuleListCreateView,
     ModuleDetailView,
     LessonListCreateView,
     LessonDetailView,
+    LessonContentView,
     RegisterUserView,
     AdminProfileListView,
     AdminUserProfileDetailView, MyStudentView, health_check, current_user
@@ -60,9 +62,16 @@ from .views import (
 from .views_extended import (
     StudentDashboardView,
     AdminDashboardView,
+    AdminThrottleMetricsView,
     StudentApplicationStatusView,
     EnrollScheduleView,
     LearningMaterialsView,
+    UploadSessionCreateView,
+    UploadSessionDetailView,
+    UploadSessionFinalizeView,
+    CourseMaterialDownloadView,
+    CourseVideoView,
+    SignedMediaView,
     my_courses,
     my_events,
 )
@@ -95,6 +104,12 @@ urlpatterns = [
     path("courses/<int:pk>/", CourseDetailView.as_view(), name="course-detail"),
     path("courses/<int:course_id>/materials/", CourseMaterialListCreateView.as_view(), name="course-materials-list"),
     path("course-materials/<int:pk>/", CourseMaterialDetailView.as_view(), name="course-material-detail"),
+    path("course-materials/<int:pk>/download/", CourseMaterialDownloadView.as_view(), name="course-material-download"),
+    path("courses/<int:pk>/video/", CourseVideoView.as_view(), name="course-video"),
+    path("media/signed/<path:name>", SignedMediaView.as_view(), name="signed-media"),
+    path("course-materials/uploads/", UploadSessionCreateView.as_view(), name="material-upload-list"),
+    path("course-materials/uploads/<uuid:pk>/", UploadSessionDetailView.as_view(), name="material-upload-detail"),
+    path("course-materials/uploads/<uuid:pk>/finalize/", UploadSessionFinalizeView.as_view(), name="material-upload-finalize"),
 
     path("selection-procedures/", SelectionProcedureListCreateView.as_view(), name="selectionprocedure-list"),
     path("selection-procedures/<int:pk>/", SelectionProcedureDetailView.as_view(), name="selectionprocedure-detail"),
@@ -125,6 +140,7 @@ urlpatterns = [
 
     path("schedules/", LearningScheduleListCreateView.as_view(), name="schedules"),
     path("schedules/<int:pk>/", LearningScheduleDetailView.as_view(),name="schedule-detail"),
+    path("schedules/<int:pk>/curriculum/", LearningScheduleCurriculumView.as_view(), name="schedule-curriculum"),
 
     path("modules/", ModuleListCreateView.as_view(), name="module-list"),
     path("modules/<int:pk>/", ModuleDetailView.as_view(), name="module-detail"),
@@ -132,6 +148,7 @@ urlpatterns = [
 
     path("lessons/", LessonListCreateView.as_view(), name="lesson-list"),
     path("lessons/<int:pk>/", LessonDetailView.as_view(), name="lesson-detail"),
+    path("lessons/<int:pk>/content/", LessonContentView.as_view(), name="lesson-content"),
     path("modules/<int:module_id>/lessons/", LessonListCreateView.as_view(),name="module-lessons"),
 
     path("students/", StudentListCreateView.as_view(), name="student-list"),
@@ -148,6 +165,7 @@ urlpatterns = [
     path("students/me/courses/", my_courses, name="my-courses"),
     path("students/me/events/", my_events, name="my-events"),
     path("admin/dashboard/", AdminDashboardView.as_view(), name="admin-dashboard"),
+    path("admin/throttles/", AdminThrottleMetricsView.as_view(), name="admin-throttle-metrics"),
 
     path("health/", health_check, name="health-check"),
 ]
@@ -1,16 +1,15 @@
 """
 Utility functions for the courses app
 """
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
 from django.conf import settings
 from django.template.loader import render_to_string
 
+from .mail import queue_email
+
 
 def send_welcome_email(user):
     """Send welcome email to newly registered user"""
-    from django.core.mail import EmailMessage
-    from django.template.loader import render_to_string
-    
     subject = "Welcome to EvolvLearn!"
     
     # Get frontend URL from settings
@@ -95,7 +94,7 @@ def send_welcome_email(user):
     )
     email.content_subtype = "html"
     email.body = html_message
-    email.send(fail_silently=True)
+    queue_email(email)
 
 
 def send_application_received_email(student):
@@ -118,13 +117,12 @@ def send_application_received_email(student):
     The EvolvLearn Team
     """
     
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [student.email],
-        fail_silently=True,
-    )
+    queue_email(EmailMessage(
+        subject=subject,
+        body=message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[student.email],
+    ))
 
 
 def send_application_status_email(student, status, message_text=""):
@@ -163,47 +161,61 @@ def send_application_status_email(student, status, message_text=""):
         The EvolvLearn Team
         """
     
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [student.email],
-        fail_silently=True,
-    )
+    queue_email(EmailMessage(
+        subject=subject,
+        body=message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[student.email],
+    ))
 
 
-def generate_student_register_number(student):
-    """Generate unique registration number for student"""
-    # Format: EVOLV-YYYY-XXXX (e.g., EVOLV-2024-0001)
-    from datetime import datetime
-    year = datetime.now().year
-    
-    # Get count of students registered this year
-    from .models import Student
-    count = Student.objects.filter(
-        register_number__startswith=f"EVOLV-{year}"
-    ).count() + 1
-    
-    return f"EVOLV-{year}-{count:04d}"
+def allocate_register_numbers(count=1, year=None):
+    """
+    Reserve `count` consecutive register numbers for a year.
+    Format: EVOLV-YYYY-XXXX (e.g., EVOLV-2024-0001)
+
+    The year's counter row is locked for the duration of the update, so
+    concurrent callers never receive the same number and the cost does not
+    depend on how many students exist.
+    """
+    from django.db import IntegrityError, transaction
+    from django.utils import timezone
+    from .models import RegisterNumberSequence
 
+    year = year or timezone.now().year
+    with transaction.atomic():
+        try:
+            sequence = RegisterNumberSequence.objects.select_for_update().get(year=year)
+        except RegisterNumberSequence.DoesNotExist:
+            try:
+                with transaction.atomic():
+                    sequence = RegisterNumberSequence.objects.create(year=year)
+            except IntegrityError:
+                # Another request created the year's row first
+                sequence = RegisterNumberSequence.objects.select_for_update().get(year=year)
 
+        start = sequence.last_value + 1
+        sequence.last_value += count
+        sequence.save(update_fields=["last_value"])
+
+    return [f"EVOLV-{year}-{value:04d}" for value in range(start, start + count)]
+
+
+def generate_student_register_number(student):
+    """Generate unique registration number for student"""
+    return allocate_register_numbers(1)[0]
 
-def generate_verification_token():
-    """Generate a unique verification token"""
-    import secrets
-    return secrets.token_urlsafe(32)
 
 
 def send_verification_email(user):
     """Send email verification link to user"""
     from django.utils import timezone
-    from django.core.mail import EmailMessage
+    from .models import EmailVerificationToken
     
-    # Generate token
-    token = generate_verification_token()
-    user.email_verification_token = token
+    # Generate token, replacing any earlier one
+    token = EmailVerificationToken.issue(user)
     user.email_verification_sent_at = timezone.now()
-    user.save()
+    user.save(update_fields=["email_verification_sent_at"])
     
     # Get frontend URL
     frontend_url = getattr(settings, 'FRONTEND_URL', 'http://localhost:3000')
@@ -302,6 +314,7 @@ def send_verification_email(user):
     )
     email.content_subtype = "html"
     email.body = html_message
-    email.send(fail_silently=True)
+    # The body holds the raw token, which must not stay in the outbox
+    queue_email(email, sensitive=True)
     
     return token
@@ -1,10 +1,21 @@
+import hashlib
+
 from django.shortcuts import render
 from django.contrib.auth.models import User
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Prefetch
+from django.utils.http import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .utils import send_welcome_email
 from .throttles import RegisterRateThrottle, ContactUsRateThrottle
+from .pagination import HybridPagination
+from .dynamic_fields import DynamicFieldsQuerysetMixin
+from .search import FullTextSearchFilter
+from .stats import CategoryCourseCounts, annotate_course_counts
+from .cache import CATALOG_NAMESPACE, calendar_namespace, curriculum_namespace, get_version, query_fingerprint
 
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.views import APIView
@@ -19,14 +30,14 @@ from .permissions import IsAdmin, IsAdminOrReadOnly, AllowAnyCreateReadAdminModi
 
 from .models import (
     Profile,Location,Partner,CourseCategory,Course,CourseMaterial,Student,CourseEnrollment,SelectionProcedure,StudentSelection,ContactUs,EventAttendance,
-    Alumni,Event,AboutUs,TeamMember,CoreValue,Review,LearningSchedule,Module,Lesson,)
+    Alumni,Event,AboutUs,TeamMember,CoreValue,Review,LearningSchedule,Module,Lesson,EmailVerificationToken,)
 
 from .serializers import (
     ProfileSerializer,LocationSerializer,PartnerSerializer,CourseCategorySerializer,ProfileSelfSerializer,CourseReadSerializer,CourseWriteSerializer,CourseMaterialSerializer,
     SelectionProcedureSerializer,StudentSelectionSerializer,ContactUsSerializer,EventAttendanceSerializer,AlumniReadSerializer,AlumniWriteSerializer,
     EventWriteSerializer,EventReadSerializer,AboutUsSerializer, TeamMemberReadSerializer,TeamMemberWriteSerializer,CoreValueSerializer,ReviewSerializer,
-    LearningScheduleSerializer, LessonReadSerializer, LessonWriteSerializer, UserProfileCreateSerializer, RegisterUserSerializer, AdminProfileUpdateSerializer,
-    ModuleReadSerializer, ModuleWriteSerializer, StudentReadSerializer, StudentWriteSerializer, CourseEnrollmentSerializer)
+    LearningScheduleSerializer, LessonReadSerializer, LessonListSerializer, LessonWriteSerializer, UserProfileCreateSerializer, RegisterUserSerializer, AdminProfileUpdateSerializer,
+    ModuleReadSerializer, ModuleWriteSerializer, CurriculumSerializer, StudentReadSerializer, StudentWriteSerializer, AdminEnrollmentSerializer)
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
@@ -95,6 +106,7 @@ class AdminProfileListView(generics.ListAPIView):
     search_fields = ["user__username","user__email","user__first_name","user__last_name","role",]
     ordering_fields = ["user__username", "user__email", "user__date_joined", "role"]
     ordering = ["user__username"]
+    pagination_class = HybridPagination
 
 
 class AdminUserProfileDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -231,7 +243,6 @@ class PartnerDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 class CourseCategoryListCreateView(generics.ListCreateAPIView):
-    queryset = CourseCategory.objects.all()
     serializer_class = CourseCategorySerializer
     permission_classes = [IsAdminOrReadOnly]
     
@@ -241,19 +252,27 @@ class CourseCategoryListCreateView(generics.ListCreateAPIView):
     ordering_fields = ["name", "order", "created_at"]
     ordering = ["order", "name"]
 
+    def get_queryset(self):
+        return annotate_course_counts(CourseCategory.objects.all())
+
 
 class CourseCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = CourseCategory.objects.all()
     serializer_class = CourseCategorySerializer
     permission_classes = [IsAdminOrReadOnly]
 
+    def get_queryset(self):
+        return annotate_course_counts(CourseCategory.objects.all())
+
 
-class CourseListCreateView(generics.ListCreateAPIView):
+class CourseListCreateView(DynamicFieldsQuerysetMixin, generics.ListCreateAPIView):
     permission_classes = [IsAdminOrInstructor]
 
+    def is_public_request(self):
+        return self.request.query_params.get('public', '').lower() == 'true'
+
     def get_queryset(self):
         # Check if this is a public view request
-        public_view = self.request.query_params.get('public', '').lower() == 'true'
+        public_view = self.is_public_request()
         
         # For public view or non-admin users, only show courses with active categories
         if public_view or not (self.request.user.is_staff or self.request.user.is_superuser):
@@ -269,17 +288,47 @@ class CourseListCreateView(generics.ListCreateAPIView):
             else CourseReadSerializer
         )
 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    def get_serializer_context(self):
+        ctx = super().get_serializer_context()
+        # Nested category details share one grouped count query per response
+        ctx["category_course_counts"] = CategoryCourseCounts()
+        return ctx
+
+    def list(self, request, *args, **kwargs):
+        # The public catalog is the same for every visitor, so its serialized
+        # pages are cached per query string until a catalog model changes
+        if not self.is_public_request():
+            return super().list(request, *args, **kwargs)
+
+        version = get_version(CATALOG_NAMESPACE)
+        fingerprint = query_fingerprint(request)
+        etag = f'"{CATALOG_NAMESPACE}-{version}-{fingerprint}"'
+
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache_key = f"{CATALOG_NAMESPACE}:{version}:{fingerprint}"
+            data = cache.get(cache_key)
+            if data is None:
+                data = super().list(request, *args, **kwargs).data
+                cache.set(cache_key, data, settings.CATALOG_CACHE_TIMEOUT)
+            response = Response(data)
+
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    filter_backends = [DjangoFilterBackend, OrderingFilter, FullTextSearchFilter]
     filterset_fields = ["category", "instructor", "partners", "locations", "parent"]
     search_fields = ["name", "description", "software_tools"]
     ordering_fields = ["name", "created_at", "instructor"]
     ordering = ["name"]
 
 
-class CourseDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CourseDetailView(DynamicFieldsQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdminOrInstructor]
     queryset = (
-        Course.objects.select_related("instructor", "parent")
+        Course.objects.select_related("instructor", "parent", "category")
         .prefetch_related("locations", "partners")
         .all()
     )
@@ -349,9 +398,9 @@ class ContactUsCreateView(generics.CreateAPIView):
         self.send_contact_notification(contact)
     
     def send_contact_notification(self, contact):
-        """Send email notification when contact form is submitted"""
+        """Queue email notifications when contact form is submitted"""
         from django.core.mail import EmailMessage
-        from django.conf import settings
+        from .mail import queue_emails
         
         subject = f"New Contact Form Submission from {contact.name}"
         
@@ -375,7 +424,6 @@ class ContactUsCreateView(generics.CreateAPIView):
             to=['evolvngo@gmail.com'],
             reply_to=[contact.email],
         )
-        admin_email.send(fail_silently=True)
         
         # Confirmation email to user
         user_subject = "We received your message - EvolvLearn"
@@ -405,7 +453,8 @@ class ContactUsCreateView(generics.CreateAPIView):
             to=[contact.email],
             reply_to=['evolvngo@gmail.com'],
         )
-        user_email.send(fail_silently=True)
+        # Both messages go out together in one batch
+        queue_emails([admin_email, user_email])
     throttle_classes = [ContactUsRateThrottle] 
 
 
@@ -421,7 +470,7 @@ class EventAttendanceDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.AllowAny]
 
 
-class AlumniListCreateView(generics.ListCreateAPIView):
+class AlumniListCreateView(DynamicFieldsQuerysetMixin, generics.ListCreateAPIView):
     queryset = Alumni.objects.select_related("user", "course", "location")
     permission_classes = [IsAdminOrReadOnly]
 
@@ -432,7 +481,7 @@ class AlumniListCreateView(generics.ListCreateAPIView):
             else AlumniReadSerializer
         )
 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, OrderingFilter, FullTextSearchFilter]
     filterset_fields = ["graduation_year", "course", "location", "user"]
     search_fields = [
         "user__username",
@@ -444,7 +493,7 @@ class AlumniListCreateView(generics.ListCreateAPIView):
     ordering = ["-graduation_year"]
 
 
-class AlumniDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AlumniDetailView(DynamicFieldsQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Alumni.objects.select_related("user", "course", "location")
     permission_classes = [IsAdminOrReadOnly]
 
@@ -456,7 +505,7 @@ class AlumniDetailView(generics.RetrieveUpdateDestroyAPIView):
         )
 
 
-class EventListCreateView(generics.ListCreateAPIView):
+class EventListCreateView(DynamicFieldsQuerysetMixin, generics.ListCreateAPIView):
     queryset = Event.objects.all()
 
     def get_serializer_class(self):
@@ -471,7 +520,7 @@ class EventListCreateView(generics.ListCreateAPIView):
 
 
 
-class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
+class EventDetailView(DynamicFieldsQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Event.objects.all()
 
     def get_serializer_class(self):
@@ -515,10 +564,18 @@ def event_calendar(request):
         else:
             end_date = datetime(year, month + 1, 1)
         
+        # Each month's payload is cached until one of its events or their
+        # attendances change (or a course/location they show is renamed)
+        namespace = calendar_namespace(year, month)
+        cache_key = f"{namespace}:{get_version(namespace)}:{get_version(CATALOG_NAMESPACE)}"
+        payload = cache.get(cache_key)
+        if payload is not None:
+            return Response(payload, status=status.HTTP_200_OK)
+
         events = Event.objects.filter(
             date__gte=start_date,
             date__lt=end_date
-        ).select_related('location', 'course').prefetch_related('partners')
+        ).select_related('location', 'course__category').annotate(attendee_count=Count('attendances'))
         
         # Format events for calendar
         events_data = []
@@ -529,23 +586,25 @@ def event_calendar(request):
                 'description': event.description,
                 'date': event.date.isoformat(),
                 'end_date': None,  # Add if you have this field
-                'event_type': event.course.category if event.course else 'General',
+                'event_type': event.course.category.name if event.course else 'General',
                 'is_virtual': event.is_virtual,
                 'location': event.location.name if event.location else 'TBA',
                 'course': event.course.name if event.course else '',
                 'speaker_name': None,  # Add if you have this field
                 'meeting_link': None,  # Add if you have this field
                 'capacity': None,  # Add if you have this field
-                'attendee_count': event.attendances.count() if hasattr(event, 'attendances') else 0,
+                'attendee_count': event.attendee_count,
                 'is_full': False,  # Calculate based on capacity if available
             })
         
-        return Response({
+        payload = {
             'events': events_data,
             'year': year,
             'month': month,
             'count': len(events_data)
-        }, status=status.HTTP_200_OK)
+        }
+        cache.set(cache_key, payload, settings.CALENDAR_CACHE_TIMEOUT)
+        return Response(payload, status=status.HTTP_200_OK)
         
     except ValueError:
         return Response(
@@ -663,9 +722,49 @@ class LearningScheduleDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = LearningScheduleSerializer
     permission_classes = [IsAdminOrInstructorOwner]
 
+class LearningScheduleCurriculumView(APIView):
+    """
+    A schedule's whole module/lesson tree in three queries (schedule,
+    modules, lessons). The serialized tree is cached per schedule until one
+    of its modules or lessons changes, or its course is renamed.
+    """
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get(self, request, pk):
+        namespace = curriculum_namespace(pk)
+        version = f"{get_version(namespace)}-{get_version(CATALOG_NAMESPACE)}"
+        etag = f'"curriculum-{pk}-{version}"'
+
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache_key = f"{namespace}:{version}"
+            data = cache.get(cache_key)
+            if data is None:
+                lessons = Lesson.objects.order_by("order", "id")
+                modules = Module.objects.order_by("order", "id").prefetch_related(
+                    Prefetch("lessons", queryset=lessons)
+                )
+                schedule = (
+                    LearningSchedule.objects.select_related("course")
+                    .prefetch_related(Prefetch("modules", queryset=modules))
+                    .filter(pk=pk)
+                    .first()
+                )
+                if schedule is None:
+                    raise NotFound("Schedule not found.")
+                data = CurriculumSerializer(schedule, context={"request": request}).data
+                cache.set(cache_key, data, settings.CURRICULUM_CACHE_TIMEOUT)
+            response = Response(data)
+
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        return response
+
+
 class ModuleListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAdminOrReadOnly]
-    queryset = Module.objects.select_related("schedule", "schedule__course").all()
+    queryset = Module.objects.select_related("schedule", "schedule__course").prefetch_related("lessons")
 
     def get_serializer_class(self):
         return ModuleWriteSerializer if self.request.method == "POST" else ModuleReadSerializer
@@ -686,7 +785,7 @@ class ModuleListCreateView(generics.ListCreateAPIView):
 
 class ModuleDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdminOrReadOnly]
-    queryset = Module.objects.select_related("schedule", "schedule__course").all()
+    queryset = Module.objects.select_related("schedule", "schedule__course").prefetch_related("lessons")
 
     def get_serializer_class(self):
         return ModuleWriteSerializer if self.request.method in ("PUT", "PATCH") else ModuleReadSerializer
@@ -694,32 +793,73 @@ class ModuleDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class LessonListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAdminOrReadOnly]
-    queryset = Lesson.objects.select_related("module", "module__schedule").all()
+    queryset = Lesson.objects.select_related("module", "module__schedule", "module__schedule__course").all()
 
     def get_serializer_class(self):
-        return LessonWriteSerializer if self.request.method == "POST" else LessonReadSerializer
+        return LessonWriteSerializer if self.request.method == "POST" else LessonListSerializer
 
     def get_queryset(self):
         qs = super().get_queryset()
+        if self.request.method == "GET":
+            # Content is only sent by the detail and content endpoints
+            qs = qs.defer("content", "search_vector")
         module_id = self.kwargs.get("module_id")
         if module_id:
             qs = qs.filter(module_id=module_id)
         return qs
 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ["module", "module__schedule", "order"]
-    search_fields = ["title", "description", "content"]
+    filter_backends = [DjangoFilterBackend, OrderingFilter, FullTextSearchFilter]
+    # On Postgres ?search= also matches content through the stored search
+    # vector, and content__icontains is served by a trigram index (migration
+    # 0038); the icontains fallback of ?search= never scans content
+    filterset_fields = {
+        "module": ["exact"],
+        "module__schedule": ["exact"],
+        "order": ["exact"],
+        "content": ["icontains"],
+    }
+    search_fields = ["title", "description"]
     ordering_fields = ["order", "title"]
     ordering = ["order"]
 
 
 class LessonDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdminOrReadOnly]
-    queryset = Lesson.objects.select_related("module", "module__schedule").all()
+    queryset = Lesson.objects.select_related("module", "module__schedule", "module__schedule__course").all()
+
+    def get_serializer_class(self):
+        return LessonWriteSerializer if self.request.method in ("PUT", "PATCH") else LessonReadSerializer
+
+
+class LessonContentView(APIView):
+    """
+    A lesson's content on its own, for clients that load it when the lesson
+    is opened. The ETag is a hash of the content, so revalidating an
+    unchanged lesson returns 304 without sending it again.
+    """
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get(self, request, pk):
+        lesson = Lesson.objects.filter(pk=pk).values("id", "content").first()
+        if lesson is None:
+            raise NotFound("Lesson not found.")
+
+        digest = hashlib.md5((lesson["content"] or "").encode()).hexdigest()
+        etag = f'"lesson-{pk}-{digest}"'
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(lesson)
 
-class StudentListCreateView(generics.ListCreateAPIView):
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        return response
+
+class StudentListCreateView(DynamicFieldsQuerysetMixin, generics.ListCreateAPIView):
     queryset = Student.objects.prefetch_related("courses", "schedules").all()
     permission_classes = [AuthenticatedCreateReadAdminModify]
+    ordering = ["id"]
+    pagination_class = HybridPagination
 
     def get_serializer_class(self):
         return StudentWriteSerializer if self.request.method == "POST" else StudentReadSerializer
@@ -730,7 +870,7 @@ class StudentListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class StudentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class StudentDetailView(DynamicFieldsQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Student.objects.prefetch_related("courses", "schedules").all()
     permission_classes = [AuthenticatedCreateReadAdminModify]
 
@@ -776,40 +916,33 @@ def verify_email(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    try:
-        user = User.objects.get(email_verification_token=token)
-        
-        # Check if token is expired (24 hours)
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        if user.email_verification_sent_at:
-            expiry_time = user.email_verification_sent_at + timedelta(hours=24)
-            if timezone.now() > expiry_time:
-                return Response(
-                    {'error': 'Verification link has expired. Please request a new one.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        
-        # Verify the email
-        user.is_email_verified = True
-        user.email_verification_token = None
-        user.save()
-        
-        # Send welcome email now
-        from .utils import send_welcome_email
-        send_welcome_email(user)
-        
-        return Response({
-            'message': 'Email verified successfully! You can now login.',
-            'email': user.email
-        }, status=status.HTTP_200_OK)
-        
-    except User.DoesNotExist:
+    verification = EmailVerificationToken.lookup(token)
+    if verification is None:
         return Response(
             {'error': 'Invalid verification token'},
             status=status.HTTP_400_BAD_REQUEST
         )
+    
+    if verification.is_expired:
+        return Response(
+            {'error': 'Verification link has expired. Please request a new one.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # Verify the email
+    user = verification.user
+    user.is_email_verified = True
+    user.save(update_fields=["is_email_verified"])
+    user.email_verification_tokens.all().delete()
+    
+    # Send welcome email now
+    from .utils import send_welcome_email
+    send_welcome_email(user)
+    
+    return Response({
+        'message': 'Email verified successfully! You can now login.',
+        'email': user.email
+    }, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -954,19 +1087,21 @@ class PublicInstructorProfileView(generics.RetrieveAPIView):
 
 
 
-class CourseEnrollmentListView(generics.ListAPIView):
+class CourseEnrollmentListView(DynamicFieldsQuerysetMixin, generics.ListAPIView):
     """List all course enrollments (for admin)"""
-    serializer_class = CourseEnrollmentSerializer
+    serializer_class = AdminEnrollmentSerializer
     permission_classes = [IsAdminOrReadOnly]
-    queryset = CourseEnrollment.objects.all().select_related('student', 'course').order_by('-applied_at')
+    queryset = CourseEnrollment.objects.all().order_by('-applied_at')
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['status', 'course']
     search_fields = ['student__first_name', 'student__last_name', 'student__email', 'course__name']
     ordering_fields = ['applied_at', 'updated_at', 'status']
+    ordering = ['-applied_at']
+    pagination_class = HybridPagination
 
 
-class CourseEnrollmentDetailView(generics.RetrieveUpdateAPIView):
+class CourseEnrollmentDetailView(DynamicFieldsQuerysetMixin, generics.RetrieveUpdateAPIView):
     """Retrieve or update a course enrollment"""
-    serializer_class = CourseEnrollmentSerializer
+    serializer_class = AdminEnrollmentSerializer
     permission_classes = [IsAdminOrReadOnly]
-    queryset = CourseEnrollment.objects.all()
+    queryset = CourseEnrollment.objects.select_related('student', 'course__category')
@@ -1,21 +1,33 @@
 """
 Extended views for additional functionality
 """
+from datetime import timedelta
+
 from rest_framework.views import APIView
+from rest_framework import generics
+from rest_framework.exceptions import NotFound
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Count, Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
 from django.utils import timezone
 
 from .models import (
     Student, StudentSelection, Course, Event, 
-    LearningSchedule, Alumni, Review, CourseEnrollment, CourseMaterial
+    LearningSchedule, Alumni, Review, CourseEnrollment, CourseMaterial, UploadSession, Profile
 )
+from .permissions import IsAdminOrInstructor
+from .stats import get_admin_stats, is_stale
+from .throttles import get_throttle_metrics
+from .uploads import append_chunk, discard_staged_file, finalize_upload, inspect_staged_file
+from .downloads import serve_file
+from .media_urls import signed_media_url, verify_media_signature
 from .serializers import (
     StudentReadSerializer, StudentSelectionSerializer,
-    CourseReadSerializer, EventReadSerializer
+    CourseReadSerializer, EventReadSerializer, CourseMaterialSerializer, UploadSessionSerializer
 )
 
 
@@ -27,28 +39,37 @@ class StudentDashboardView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        try:
-            student = request.user.student
-        except Student.DoesNotExist:
+        # Selection progress is stored on the student row; related rows come
+        # from a fixed number of prefetch queries
+        student = (
+            Student.objects.filter(user=request.user)
+            .select_related("user")
+            .prefetch_related(
+                Prefetch("courses", queryset=Course.objects.select_related("parent")),
+                Prefetch(
+                    "enrollments",
+                    queryset=CourseEnrollment.objects.select_related("course__category"),
+                ),
+                Prefetch(
+                    "schedules",
+                    queryset=LearningSchedule.objects.select_related("course", "location"),
+                ),
+                "selection_steps",
+            )
+            .first()
+        )
+        if student is None:
             return Response(
                 {"detail": "Student profile not found. Please complete your application."},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Get application status
-        selection_steps = StudentSelection.objects.filter(student=student)
-        total_steps = selection_steps.count()
-        completed_steps = selection_steps.filter(status="Completed").count()
-        
-        application_status = "pending"
-        if total_steps > 0:
-            if completed_steps == total_steps:
-                application_status = "approved"
-            elif completed_steps > 0:
-                application_status = "in_progress"
-
-        # Get enrolled schedules
-        enrolled_schedules = student.schedules.all()
+        # Get application status (the dashboard reports "submitted" as pending)
+        total_steps = student.total_steps
+        completed_steps = student.completed_steps
+        application_status = student.application_status
+        if application_status == "submitted":
+            application_status = "pending"
 
         # Get upcoming events
         upcoming_events = Event.objects.filter(
@@ -61,7 +82,7 @@ class StudentDashboardView(APIView):
             "selection_progress": {
                 "total_steps": total_steps,
                 "completed_steps": completed_steps,
-                "steps": StudentSelectionSerializer(selection_steps, many=True).data
+                "steps": StudentSelectionSerializer(student.selection_steps.all(), many=True).data
             },
             "enrolled_schedules": [
                 {
@@ -71,7 +92,7 @@ class StudentDashboardView(APIView):
                     "end_date": schedule.end_date,
                     "location": str(schedule.location),
                 }
-                for schedule in enrolled_schedules
+                for schedule in student.schedules.all()
             ],
             "upcoming_events": [
                 {
@@ -100,68 +121,32 @@ class AdminDashboardView(APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        # Student statistics
-        total_students = Student.objects.count()
-        
-        # Count pending applications (students with incomplete selection steps)
-        pending_applications = Student.objects.filter(
-            Q(selection_steps__status="Pending") |
-            ~Q(selection_steps__isnull=False)
-        ).distinct().count()
-
-        # Course statistics
-        active_courses = Course.objects.filter(parent__isnull=True).count()
-        total_subcourses = Course.objects.filter(parent__isnull=False).count()
-
-        # Event statistics
-        upcoming_events = Event.objects.filter(date__gte=timezone.now()).count()
-        past_events = Event.objects.filter(date__lt=timezone.now()).count()
-
-        # Schedule statistics
-        active_schedules = LearningSchedule.objects.filter(
-            end_date__gte=timezone.now().date()
-        ).count()
-
-        # Alumni statistics
-        total_alumni = Alumni.objects.count()
-
-        # Review statistics
-        total_reviews = Review.objects.count()
-        avg_rating = Review.objects.aggregate(
-            avg=Count('rating')
-        ).get('avg', 0)
-
-        data = {
-            "students": {
-                "total": total_students,
-                "pending_applications": pending_applications,
-                "approved": total_students - pending_applications,
-            },
-            "courses": {
-                "active": active_courses,
-                "subcourses": total_subcourses,
-                "total": active_courses + total_subcourses,
-            },
-            "events": {
-                "upcoming": upcoming_events,
-                "past": past_events,
-                "total": upcoming_events + past_events,
-            },
-            "schedules": {
-                "active": active_schedules,
-            },
-            "alumni": {
-                "total": total_alumni,
-            },
-            "reviews": {
-                "total": total_reviews,
-                "average_rating": avg_rating,
-            }
-        }
+        # Served from a precomputed snapshot; ?fresh=true forces a recompute
+        fresh = request.query_params.get("fresh", "").lower() == "true"
+        snapshot = get_admin_stats(fresh=fresh)
 
+        data = dict(snapshot.data)
+        data["computed_at"] = snapshot.computed_at
+        data["is_stale"] = is_stale(snapshot)
         return Response(data)
 
 
+class AdminThrottleMetricsView(APIView):
+    """
+    Allowed and throttled request totals per throttle scope
+    GET /api/v1/admin/throttles/
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        rates = settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]
+        metrics = get_throttle_metrics(list(rates))
+        return Response({
+            scope: {"rate": rate, **metrics[scope]}
+            for scope, rate in rates.items()
+        })
+
+
 class StudentApplicationStatusView(APIView):
     """
     Check student application status
@@ -182,20 +167,17 @@ class StudentApplicationStatusView(APIView):
             )
 
         selection_steps = StudentSelection.objects.filter(student=student)
-        total_steps = selection_steps.count()
-        completed_steps = selection_steps.filter(status="Completed").count()
+        total_steps = student.total_steps
+        completed_steps = student.completed_steps
+        application_status = student.application_status
 
-        if total_steps == 0:
-            application_status = "submitted"
+        if application_status == "submitted":
             message = "Your application is under review."
-        elif completed_steps == total_steps:
-            application_status = "approved"
+        elif application_status == "approved":
             message = "Congratulations! Your application has been approved."
-        elif completed_steps > 0:
-            application_status = "in_progress"
+        elif application_status == "in_progress":
             message = f"Your application is in progress. {completed_steps}/{total_steps} steps completed."
         else:
-            application_status = "pending"
             message = "Your application is pending review."
 
         return Response({
@@ -226,12 +208,8 @@ class EnrollScheduleView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Check if application is approved
-        selection_steps = StudentSelection.objects.filter(student=student)
-        total_steps = selection_steps.count()
-        completed_steps = selection_steps.filter(status="Completed").count()
-        
-        if total_steps > 0 and completed_steps < total_steps:
+        # Check if application is approved (applications without steps may enroll)
+        if student.application_status not in ("submitted", "approved"):
             return Response(
                 {"detail": "Your application must be approved before enrolling in courses."},
                 status=status.HTTP_403_FORBIDDEN
@@ -308,12 +286,18 @@ class LearningMaterialsView(APIView):
         # Serialize materials
         materials_data = []
         for material in materials:
+            # Access was checked above; the signed URL carries it to the
+            # download without another enrollment lookup. It is the only
+            # link handed out, so expiry and key rotation revoke access
+            signed_url = signed_media_url(request, material.file.name) if material.file else None
             materials_data.append({
                 'id': material.id,
                 'title': material.title,
                 'description': material.description,
                 'material_type': material.material_type,
-                'file_url': request.build_absolute_uri(material.file.url) if material.file else None,
+                # Kept for existing clients; same link as download_url
+                'file_url': signed_url,
+                'download_url': signed_url,
                 'file_size': material.get_file_size_display(),
                 'file_extension': material.get_file_extension(),
                 'course_id': material.course.id,
@@ -357,6 +341,248 @@ class LearningMaterialsView(APIView):
         })
 
 
+class UploadSessionCreateView(generics.CreateAPIView):
+    """
+    Start a chunked course material upload
+    POST /api/v1/course-materials/uploads/
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrInstructor]
+
+    def perform_create(self, serializer):
+        serializer.save(uploaded_by=self.request.user)
+
+
+def get_upload_session(request, pk, lock=False):
+    sessions = UploadSession.objects.filter(pk=pk, expires_at__gt=timezone.now())
+    if not request.user.is_staff:
+        sessions = sessions.filter(uploaded_by=request.user)
+    if lock:
+        sessions = sessions.select_for_update()
+    session = sessions.first()
+    if session is None:
+        raise NotFound("Upload not found.")
+    return session
+
+
+def upload_response(session, status_code=status.HTTP_200_OK):
+    response = Response(UploadSessionSerializer(session).data, status=status_code)
+    response["Upload-Offset"] = str(session.received)
+    return response
+
+
+class UploadSessionDetailView(APIView):
+    """
+    GET    /api/v1/course-materials/uploads/<id>/   progress, to resume from
+    PUT    /api/v1/course-materials/uploads/<id>/   raw chunk body with an
+                                                    Upload-Offset header
+    DELETE /api/v1/course-materials/uploads/<id>/   abandon the upload
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrInstructor]
+
+    def get(self, request, pk):
+        return upload_response(get_upload_session(request, pk))
+
+    def put(self, request, pk):
+        try:
+            offset = int(request.headers["Upload-Offset"])
+        except (KeyError, ValueError):
+            return Response(
+                {"detail": "An Upload-Offset header is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            length = int(request.META.get("CONTENT_LENGTH") or "")
+        except ValueError:
+            return Response(
+                {"detail": "A Content-Length header is required."},
+                status=status.HTTP_411_LENGTH_REQUIRED
+            )
+        if length < 0:
+            return Response(
+                {"detail": "The Content-Length header must not be negative."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if length > settings.UPLOAD_CHUNK_SIZE:
+            return Response(
+                {"detail": f"Chunks are limited to {settings.UPLOAD_CHUNK_SIZE} bytes."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        # The lease keeps two requests from writing the same staging file;
+        # no transaction stays open while the chunk streams in
+        with transaction.atomic():
+            session = get_upload_session(request, pk, lock=True)
+            if session.status != "uploading":
+                return Response(
+                    {"detail": "This upload has already been finalized."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if session.writing_until and session.writing_until > timezone.now():
+                response = Response(
+                    {"detail": "Another chunk of this upload is being written.", "received": session.received},
+                    status=status.HTTP_409_CONFLICT
+                )
+                response["Upload-Offset"] = str(session.received)
+                return response
+            if offset != session.received:
+                response = Response(
+                    {"detail": f"Expected a chunk at offset {session.received}.", "received": session.received},
+                    status=status.HTTP_409_CONFLICT
+                )
+                response["Upload-Offset"] = str(session.received)
+                return response
+            if offset + length > session.size:
+                return Response(
+                    {"detail": "The chunk goes past the end of the file."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if not length:
+                return upload_response(session)
+            lease = timezone.now() + timedelta(seconds=settings.UPLOAD_CHUNK_LEASE)
+            session.writing_until = lease
+            session.save(update_fields=["writing_until"])
+
+        complete = False
+        try:
+            complete = append_chunk(session, request.stream, length)
+        finally:
+            with transaction.atomic():
+                session = get_upload_session(request, pk, lock=True)
+                kept_lease = session.writing_until == lease
+                if kept_lease:
+                    if complete:
+                        session.received += length
+                    session.writing_until = None
+                    session.save(update_fields=["received", "writing_until"])
+
+        if not kept_lease:
+            response = Response(
+                {"detail": "The chunk took too long and was dropped; resume from the last offset.", "received": session.received},
+                status=status.HTTP_409_CONFLICT
+            )
+            response["Upload-Offset"] = str(session.received)
+            return response
+        if not complete:
+            return Response(
+                {"detail": "The chunk ended early; resume from the last offset.", "received": session.received},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return upload_response(session)
+
+    def delete(self, request, pk):
+        session = get_upload_session(request, pk)
+        discard_staged_file(session)
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def finalize_conflict(session):
+    """The 409 response for a session that cannot be finalized, if any"""
+    if session.status != "uploading":
+        return Response(
+            {"detail": "This upload has already been finalized."},
+            status=status.HTTP_409_CONFLICT
+        )
+    if session.received != session.size:
+        return Response(
+            {"detail": f"Only {session.received} of {session.size} bytes have been received.", "received": session.received},
+            status=status.HTTP_409_CONFLICT
+        )
+    return None
+
+
+class UploadSessionFinalizeView(APIView):
+    """
+    Create the course material once every byte has been received
+    POST /api/v1/course-materials/uploads/<id>/finalize/
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrInstructor]
+
+    def post(self, request, pk):
+        session = get_upload_session(request, pk)
+        conflict = finalize_conflict(session)
+        if conflict:
+            return conflict
+
+        # A fully received staging file no longer changes, so it is hashed
+        # before taking the row lock
+        try:
+            staged = inspect_staged_file(session.staging_path)
+        except FileNotFoundError:
+            raise NotFound("Upload not found.")
+
+        with transaction.atomic():
+            session = get_upload_session(request, pk, lock=True)
+            conflict = finalize_conflict(session)
+            if conflict:
+                return conflict
+            material = finalize_upload(session, staged)
+
+        serializer = CourseMaterialSerializer(material, context={"request": request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+def can_access_course_files(user, course_id):
+    """Staff, instructors and students approved for the course"""
+    if user.is_staff:
+        return True
+    try:
+        if user.profile.role == 'Instructor':
+            return True
+    except Profile.DoesNotExist:
+        pass
+    return CourseEnrollment.objects.filter(
+        student__user=user, course_id=course_id, status='Approved'
+    ).exists()
+
+
+class CourseMaterialDownloadView(APIView):
+    """
+    Download or stream a course material, with Range support
+    GET /api/v1/course-materials/<id>/download/
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        material = CourseMaterial.objects.filter(pk=pk).only('id', 'course_id', 'file').first()
+        if material is None or not can_access_course_files(request.user, material.course_id):
+            raise NotFound("Material not found.")
+        return serve_file(request, material.file.name, material.file.storage)
+
+
+class CourseVideoView(APIView):
+    """
+    Stream a course's video, with Range support so players can seek
+    GET /api/v1/courses/<id>/video/
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        course = Course.objects.filter(pk=pk).only('id', 'video_content').first()
+        if course is None or not course.video_content or not can_access_course_files(request.user, course.pk):
+            raise NotFound("Video not found.")
+        return serve_file(request, course.video_content.name, course.video_content.storage)
+
+
+class SignedMediaView(APIView):
+    """
+    Serve a file through a signed URL minted by courses.media_urls
+    GET /api/v1/media/signed/<name>?exp=...&kid=...&sig=...
+    """
+    # The signature is the credential: skip authentication and the
+    # throttles, which may count in the database, so a request touches no
+    # rows
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = []
+
+    def get(self, request, name):
+        if not verify_media_signature(name, request.query_params):
+            raise NotFound("File not found.")
+        return serve_file(request, name)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def my_courses(request):
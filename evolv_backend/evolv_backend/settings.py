@@ -78,9 +78,10 @@ DATABASES = {
 
 AUTH_USER_MODEL = "courses.CustomUser"
 
+# EmailOrUsernameBackend also matches plain usernames, so a failed login
+# is not looked up a second time by a fallback ModelBackend
 AUTHENTICATION_BACKENDS = [
     'courses.authentication.EmailOrUsernameBackend',  
-    'django.contrib.auth.backends.ModelBackend',  
 ]
 
 _frontends = [
@@ -113,6 +114,36 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing profile. Its hasher hashes new passwords; the remaining
+# PASSWORD_HASHERS only verify existing hashes, which are rehashed with the
+# profile's hasher on the user's next login.
+# Compare profiles with: manage.py benchmark_login
+PASSWORD_HASHER_PROFILES = {
+    "pbkdf2": ["courses.hashers.TunedPBKDF2PasswordHasher"],
+    "scrypt": ["courses.hashers.TunedScryptPasswordHasher"],
+    # Needs argon2-cffi (pip install "django[argon2]")
+    "argon2": ["courses.hashers.TunedArgon2PasswordHasher"],
+}
+_VERIFY_ONLY_HASHERS = [
+    "courses.hashers.TunedPBKDF2PasswordHasher",
+    "courses.hashers.TunedScryptPasswordHasher",
+    "courses.hashers.TunedArgon2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+PASSWORD_HASHER_PROFILE = os.getenv("PASSWORD_HASHER_PROFILE", "pbkdf2")
+PASSWORD_HASHERS = PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE] + [
+    hasher for hasher in _VERIFY_ONLY_HASHERS
+    if hasher not in PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]
+]
+
+# Cost parameters (defaults are Django's)
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", 870000))
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.getenv("PASSWORD_SCRYPT_WORK_FACTOR", 2**14))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST", 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv("PASSWORD_ARGON2_MEMORY_COST", 102400))  # KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", 8))
+
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
 USE_I18N = True
@@ -139,8 +170,8 @@ REST_FRAMEWORK = {
     "DEFAULT_VERSIONING_CLASS": "rest_framework.versioning.NamespaceVersioning",
 
     'DEFAULT_THROTTLE_CLASSES': [
-    'rest_framework.throttling.AnonRateThrottle',
-    'rest_framework.throttling.UserRateThrottle'
+    'courses.throttles.AnonFixedWindowThrottle',
+    'courses.throttles.UserFixedWindowThrottle'
 ],
 'DEFAULT_THROTTLE_RATES': {
     'anon': '100/hour',
@@ -148,6 +179,7 @@ REST_FRAMEWORK = {
     'register': '5/hour',
     'login': '10/hour',
     'contact': '3/hour',
+    'student_application': '2/day',
 }
 }
 
@@ -165,9 +197,107 @@ SPECTACULAR_SETTINGS = {
     "VERSION": "1.0.0",
 }
 
+# Cache configuration. Local memory is per process, so production should
+# point CACHE_BACKEND at a backend shared by all workers (file, database or Redis)
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "evolv-default"),
+    }
+}
+
+# Throttle counters need atomic increments shared by every worker, i.e.
+# Redis. Without REDIS_URL they fall back to the default cache
+REDIS_URL = os.getenv("REDIS_URL", "")
+CACHES["throttle"] = (
+    {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}
+    if REDIS_URL
+    else CACHES["default"]
+)
+
+# Where throttle counters and their metrics live: the THROTTLE_CACHE_ALIAS
+# cache when it is shared by all workers, otherwise the ThrottleCounter
+# table. Local memory caches are per process and file caches have no atomic
+# increment, so counting in either would multiply every limit by the number
+# of gunicorn workers.
+THROTTLE_CACHE_ALIAS = os.getenv("THROTTLE_CACHE_ALIAS", "throttle")
+PROCESS_LOCAL_CACHE_BACKENDS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.filebased.FileBasedCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+THROTTLE_STORE = os.getenv("THROTTLE_STORE") or (
+    "courses.throttles.DatabaseThrottleStore"
+    if CACHES[THROTTLE_CACHE_ALIAS]["BACKEND"] in PROCESS_LOCAL_CACHE_BACKENDS
+    else "courses.throttles.CacheThrottleStore"
+)
+
+# Upper bound (seconds) on how long a cached public catalog response is served
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", 300))
+
+# Upper bound (seconds) on how long a cached event calendar month is served
+CALENDAR_CACHE_TIMEOUT = int(os.getenv("CALENDAR_CACHE_TIMEOUT", 3600))
+
+# Text search configuration used for the stored course/lesson/alumni search
+# vectors; changing it requires: python manage.py rebuild_search_vectors
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "english")
+
+# Upper bound (seconds) on how long a cached schedule curriculum tree is served
+CURRICULUM_CACHE_TIMEOUT = int(os.getenv("CURRICULUM_CACHE_TIMEOUT", 3600))
+
+# Age (seconds) after which the admin dashboard statistics snapshot is
+# reported as stale; also the default interval of refresh_admin_stats --loop
+ADMIN_STATS_MAX_AGE = int(os.getenv("ADMIN_STATS_MAX_AGE", 300))
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Internal nginx location mapped to MEDIA_ROOT. When set, material and video
+# downloads are handed to nginx with X-Accel-Redirect instead of being
+# streamed by a worker, e.g. "/protected-media/" with
+#   location /protected-media/ { internal; alias /path/to/media/; }
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "")
+
+# Keys for signed media URLs as comma-separated "kid:secret" pairs, newest
+# first. Links are signed with the first key and accepted with any listed
+# key; removing a key revokes every link signed with it. Defaults to a key
+# derived from SECRET_KEY
+MEDIA_SIGNING_KEYS = [
+    tuple(pair.strip().split(":", 1))
+    for pair in os.getenv("MEDIA_SIGNING_KEYS", "").split(",")
+    if ":" in pair
+]
+# Seconds a signed media URL stays valid
+MEDIA_URL_LIFETIME = int(os.getenv("MEDIA_URL_LIFETIME", 4 * 3600))
+
+# Chunked course material uploads. Chunks are staged on local disk, so every
+# worker that can receive a chunk must see the same UPLOAD_STAGING_DIR
+UPLOAD_STAGING_DIR = os.getenv("UPLOAD_STAGING_DIR", str(BASE_DIR / "upload_staging"))
+# Largest chunk accepted per request and largest file accepted overall (bytes)
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", 5 * 1024 * 1024 * 1024))
+# Hours an unfinished upload can be resumed before it is swept
+UPLOAD_SESSION_LIFETIME = int(os.getenv("UPLOAD_SESSION_LIFETIME", 24))
+# Seconds a chunk being written keeps other chunks of its upload out. It
+# outlasts the gunicorn timeout, so a lease only expires once its request
+# is gone
+UPLOAD_CHUNK_LEASE = int(os.getenv("UPLOAD_CHUNK_LEASE", 660))
+
+# Responsive variants of uploaded images, rendered by the
+# process_image_variants worker into IMAGE_VARIANTS_DIR of the media storage.
+# Widths wider than the original are skipped
+IMAGE_VARIANT_WIDTHS = [
+    int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(",") if width.strip()
+]
+IMAGE_VARIANT_FORMATS = [
+    fmt.strip() for fmt in os.getenv("IMAGE_VARIANT_FORMATS", "webp,jpeg").split(",") if fmt.strip()
+]
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", 80))
+IMAGE_VARIANTS_DIR = os.getenv("IMAGE_VARIANTS_DIR", "variants")
+# Seconds a worker's claim on a batch lasts before another worker may
+# render it (covers a worker that died mid-batch)
+IMAGE_VARIANT_CLAIM_TIMEOUT = int(os.getenv("IMAGE_VARIANT_CLAIM_TIMEOUT", 600))
+
 # Email Configuration
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
@@ -178,6 +308,20 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'EvolvLearn <evolvngo@gmail.com>')
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 
+# Outbound email queue: requests only insert into the outbox and the
+# send_queued_email worker delivers it. Disable to send inline instead.
+EMAIL_OUTBOX_ENABLED = os.getenv('EMAIL_OUTBOX_ENABLED', 'True').lower() == 'true'
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 6))
+EMAIL_OUTBOX_RETRY_DELAY = int(os.getenv('EMAIL_OUTBOX_RETRY_DELAY', 60))  # seconds, doubled per attempt
+# Seconds a worker's claim on a batch lasts before a crashed worker's
+# unsent emails are picked up again
+EMAIL_OUTBOX_CLAIM_TIMEOUT = int(os.getenv('EMAIL_OUTBOX_CLAIM_TIMEOUT', 600))
+# Days sent and dead-lettered emails are kept (see sweep_outbound_email)
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv('EMAIL_OUTBOX_RETENTION_DAYS', 30))
+
+# Hours an email verification link stays valid
+EMAIL_VERIFICATION_TOKEN_LIFETIME = int(os.getenv('EMAIL_VERIFICATION_TOKEN_LIFETIME', 24))
+
 
 
 # Static files configuration for production
@@ -6,6 +6,22 @@ echo "Starting EvolvLearn Backend..."
 # Change to the evolv_backend directory
 cd "$(dirname "$0")"
 
+# Start the outbound email worker
+echo "Starting email worker..."
+python manage.py send_queued_email --loop &
+
+# Render responsive variants of uploaded images
+echo "Starting image variants worker..."
+python manage.py process_image_variants --loop &
+
+# Keep the admin dashboard statistics snapshot current
+echo "Starting admin stats worker..."
+python manage.py refresh_admin_stats --loop &
+
+# Remove expired throttle counters (only used without REDIS_URL)
+echo "Starting throttle counter sweeper..."
+python manage.py sweep_throttle_counters --loop &
+
 # Start Gunicorn
 echo "Starting Gunicorn server..."
 gunicorn --bind=0.0.0.0:8000 --workers=4 --timeout=600 --access-logfile '-' --error-logfile '-' evolv_backend.wsgi:application